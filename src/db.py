@@ -6,25 +6,177 @@ Supports:
   - CSV files (.csv)
   - Excel files (.xlsx, .xls)
 
-CSV/Excel files are loaded into an in-memory SQLite database via pandas,
-making everything uniformly queryable with SQL.
+CSV/Excel files are loaded into an in-memory SQLite database (via PyArrow
+when it is installed, pandas otherwise), making everything uniformly
+queryable with SQL.
 """
 
+import csv
+import datetime
+import functools
+import importlib.util
+import itertools
 import logging
 import os
 import re
 import sqlite3
+import threading
 import time
-
-import pandas as pd
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+try:
+    import re2 as _regex  # google-re2: linear-time DFA matching
+except ImportError:  # Optional dependency — the stdlib engine works too
+    _regex = re
+
+# pandas, PyArrow, ADBC, and sqlparse are imported on first use, keeping them
+# off the server's startup path
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
-# Module-level connection
-_connection: sqlite3.Connection | None = None
+# Arrow's CSV reader parses in parallel blocks of this size
+_ARROW_CSV_BLOCK_SIZE = 16 << 20
+
+# Connection tuning for the read-only workload: 256 MiB mmap, 64 MiB cache
+_READ_PRAGMAS = (
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Streaming CSV loader (USE_PANDAS_CSV=0): rows used for type sniffing,
+# and rows per executemany batch
+_CSV_SNIFF_ROWS = 1000
+_CSV_CHUNK_ROWS = 50_000
+# What the streaming loader accepts as numbers: plain decimal text only
+# (int()/float() would also take "1_000" and unbounded integers)
+_CSV_INT_RE = re.compile(r"[+-]?[0-9]+")
+_CSV_FLOAT_RE = re.compile(r"[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?")
+_INT64_MIN, _INT64_MAX = -(2**63), 2**63 - 1
+
+# Streaming Excel loader: rows per executemany batch (the first batch is
+# also the type-sniffing sample)
+_EXCEL_CHUNK_ROWS = 10_000
+
+# Statements execute_query reads out through ADBC, when it is installed
+_ADBC_PREFIXES = ("SELECT", "WITH", "VALUES")
+
+# execute_query fetches result rows in batches of this size
+_FETCH_CHUNK_ROWS = 10_000
+# ...and stores text columns with fewer distinct values than this fraction
+# of their rows as pandas categoricals
+_CATEGORY_MAX_RATIO = 0.5
+
+# Runs of non-word characters in sheet names become "_" in table names
+_SAFE_NAME_RE = re.compile(r"\W+")
+
+# ── Query validation ─────────────────────────────────────────────────────────
+# Write/DDL keywords — the single source for the regex below and for the
+# sqlparse verifier
+_DANGEROUS_KEYWORDS = frozenset({
+    "INSERT", "UPDATE", "DELETE", "DROP", "ALTER", "CREATE", "REPLACE",
+    "ATTACH", "DETACH", "VACUUM", "TRUNCATE", "GRANT", "REVOKE", "MERGE",
+})
+# Whole-word match on any of them, applied to uppercased text. REPLACE only
+# counts as a statement (REPLACE INTO ...) so the replace() string function
+# stays usable.
+_DANGEROUS_RE = _regex.compile(
+    r"\b(?:"
+    + "|".join(sorted(_DANGEROUS_KEYWORDS - {"REPLACE"}))
+    + r")\b|\bREPLACE\s+INTO\b"
+)
+# Statements must open with one of these keywords (cleaned, uppercased text).
+# No word boundary is needed: no SQLite statement keyword merely starts with
+# one of them, so e.g. "SELECTX" can only be a syntax error.
+_SAFE_PREFIXES = ("SELECT", "WITH", "EXPLAIN", "PRAGMA", "VALUES")
+# query_only doesn't stop every PRAGMA side effect (journal_mode=WAL is
+# persisted in the file), so only these introspection pragmas are accepted,
+# and never with an assignment. Matched against _unquote_for_pragma_check()
+# output, uppercased; an EXPLAIN prefix is covered too, since some pragmas
+# act while the statement is prepared.
+_READ_ONLY_PRAGMAS = frozenset(
+    {
+        "collation_list",
+        "compile_options",
+        "database_list",
+        "foreign_key_check",
+        "foreign_key_list",
+        "freelist_count",
+        "function_list",
+        "index_info",
+        "index_list",
+        "index_xinfo",
+        "integrity_check",
+        "module_list",
+        "page_count",
+        "pragma_list",
+        "quick_check",
+        "table_info",
+        "table_list",
+        "table_xinfo",
+    }
+)
+_PRAGMA_RE = _regex.compile(
+    r"^\s*(?:EXPLAIN\s+(?:QUERY\s+PLAN\s+)?)?PRAGMA\b\s*(?:\w+\s*\.\s*)?(\w*)\s*(=?)"
+)
+# SQLite accepts a PRAGMA's schema and name in any quoting — "x", [x], `x`,
+# even 'x' — so for that check quotes are unwrapped (not blanked) and only
+# comments become spaces. Group 1 is the quoted text, if any.
+_QUOTED_OR_COMMENT_RE = re.compile(
+    r"(?s)'((?:[^']|'')*)'?"
+    r'|"((?:[^"]|"")*)"?'
+    r"|`((?:[^`]|``)*)`?"
+    r"|\[([^\]]*)\]?"
+    r"|--[^\n]*"
+    r"|/\*.*?(?:\*/|$)"
+)
+# One alternation over everything that can hide keywords: '...', "...", and
+# `...` (a doubled quote is an escaped quote), [bracketed] identifiers (no
+# escapes), -- line comments, and /* block comments */. Unterminated quotes
+# and comments run to the end of the text.
+_LITERALS_AND_COMMENTS_RE = _regex.compile(
+    r"(?s)'[^']*(?:''[^']*)*'?"
+    r'|"[^"]*(?:""[^"]*)*"?'
+    r"|`[^`]*(?:``[^`]*)*`?"
+    r"|\[[^\]]*\]?"
+    r"|--[^\n]*"
+    r"|/\*.*?(?:\*/|$)"
+)
+
+# Also run the sqlparse reference validator (debugging aid)
+_SQLPARSE_VERIFY = os.getenv("SQLPARSE_VERIFY") == "1"
+
+# Each thread lazily opens its own read-only connection to the active
+# database and reuses it for every later call. Connections this module opens
+# are tracked so a source change can close them all; the generation counter
+# makes other threads' stale thread-locals reconnect.
+_TLS = threading.local()
+_database: str | None = None  # path or URI every thread connects to
+_file_backed = False
+_generation = 0
+_owned_connections: list = []  # sqlite3 and (optional) ADBC connections
+# A caller-owned connection shared by all threads (see reset_connection)
+_shared_connection: sqlite3.Connection | None = None
+_connections_lock = threading.Lock()
 _data_source_path: str | None = None
 
+# CSV/Excel data lives in a named shared-cache in-memory database, so every
+# thread's connection sees the same tables
+_memory_db_ids = itertools.count(1)
+
+# Introspected schema, cached as (version, schema). The version pairs a
+# counter bumped whenever the data source changes with SQLite's PRAGMA
+# schema_version, which changes on any DDL; dependent caches (e.g. the
+# rendered schema markdown) key on it too.
+_Schema = dict[str, tuple[tuple[str, ...], tuple[str, ...]]]
+_schema_cache: tuple[tuple[int, int], _Schema] | None = None
+_schema_generation = 0
+# Serializes rebuilds, so concurrent misses introspect only once
+_schema_lock = threading.Lock()
+
 
 def init_db(data_source: str | None = None) -> None:
     """
@@ -34,9 +186,9 @@ def init_db(data_source: str | None = None) -> None:
         data_source: Path to a .db/.sqlite, .csv, or .xlsx file.
                      Falls back to DATA_SOURCE env var, then to bundled sample.db.
     """
-    global _connection, _data_source_path
+    global _data_source_path, _database, _file_backed
 
-    if _connection is not None:
+    if _database is not None or _shared_connection is not None:
         return  # Already initialized
 
     # Resolve data source path
@@ -49,77 +201,629 @@ def init_db(data_source: str | None = None) -> None:
     ext = Path(source).suffix.lower()
 
     if ext in (".db", ".sqlite", ".sqlite3"):
-        _connection = sqlite3.connect(source)
-    elif ext == ".csv":
-        _connection = _load_file_to_sqlite(source, "csv")
-    elif ext in (".xlsx", ".xls"):
-        _connection = _load_file_to_sqlite(source, "excel")
+        database = source
+        conn = _connect(database)
+    elif ext in (".csv", ".xlsx", ".xls"):
+        database = f"file:mcp-data-analyst-{next(_memory_db_ids)}?mode=memory&cache=shared"
+        conn = _connect(database)
+        # The loaders batch their inserts in explicit `with conn:` transactions
+        conn.isolation_level = "DEFERRED"
+        _load_file_to_sqlite(source, "csv" if ext == ".csv" else "excel", conn)
+        conn.isolation_level = None
     else:
         raise ValueError(
             f"Unsupported file type: '{ext}'. "
             "Supported: .db, .sqlite, .csv, .xlsx, .xls"
         )
 
+    _configure_connection(conn)
+    with _connections_lock:
+        _database, _file_backed = database, database == source
+    # This connection also keeps a shared in-memory database alive
+    _adopt_connection(conn)
+
+    _invalidate_schema_cache()
+    _validate_cached.cache_clear()
     logger.info("db_initialized", extra={"source": source, "type": ext})
 
 
-def _load_file_to_sqlite(path: str, file_type: str) -> sqlite3.Connection:
-    """Load a CSV or Excel file into an in-memory SQLite database."""
-    conn = sqlite3.connect(":memory:")
+def _connect(database: str) -> sqlite3.Connection:
+    """
+    Open an autocommit connection usable from any thread.
+
+    `database` may be a URI. Queries are read-only, so there are no
+    implicit transactions to manage.
+    """
+    return sqlite3.connect(
+        database, uri=True, check_same_thread=False, isolation_level=None
+    )
+
+
+def _adopt_connection(conn: sqlite3.Connection) -> None:
+    """Track a module-opened connection and make it this thread's connection."""
+    with _connections_lock:
+        _owned_connections.append(conn)
+        _TLS.conn, _TLS.generation = conn, _generation
+
+
+def _get_conn() -> sqlite3.Connection:
+    """Return the calling thread's connection, opening it on first use."""
+    if _shared_connection is not None:
+        return _shared_connection
+    conn = getattr(_TLS, "conn", None)
+    if conn is not None and _TLS.generation == _generation:
+        return conn
+
+    if _database is None:
+        init_db()  # Opens and adopts the first connection for this thread
+        if _shared_connection is None and _TLS.generation == _generation:
+            return _TLS.conn
+
+    conn = _connect(_database)
+    _configure_connection(conn)
+    _adopt_connection(conn)
+    return conn
+
+
+def reset_connection(conn: sqlite3.Connection | None = None) -> None:
+    """
+    Close every connection this module opened and forget the data source.
+
+    If `conn` is given, all threads use it from then on (e.g. a test
+    fixture's in-memory database). It stays owned by the caller and is
+    never closed here.
+    """
+    global _database, _file_backed, _generation, _owned_connections
+    global _shared_connection, _data_source_path
+    with _connections_lock:
+        for owned in _owned_connections:
+            owned.close()
+        _owned_connections = []
+        _database, _file_backed = None, False
+        _shared_connection = conn
+        _data_source_path = None
+        _generation += 1
+        _TLS.conn = _TLS.adbc_conn = None
+    _invalidate_schema_cache()
+
+
+def _configure_connection(conn: sqlite3.Connection) -> None:
+    """
+    Tune a connection for the read-only analytical workload.
+
+    Memory-maps the database, enlarges the page cache, and keeps temp
+    b-trees in RAM. The journal mode is left alone: WAL would be persisted
+    in the user's file and create -wal/-shm files next to it. Finally
+    query_only is set, so SQLite itself rejects any write — a safety net
+    behind validate_query.
+    """
+    for pragma in _READ_PRAGMAS:
+        conn.execute(pragma)
+    conn.execute("PRAGMA query_only=1")
+
+
+def _load_file_to_sqlite(path: str, file_type: str, conn: sqlite3.Connection) -> None:
+    """Load a CSV or Excel file into the (in-memory) database behind `conn`."""
+    import pandas as pd
+
     table_name = Path(path).stem  # Use filename (without extension) as table name
 
     if file_type == "csv":
-        df = pd.read_csv(path)
-        df.to_sql(table_name, conn, index=False, if_exists="replace")
+        if os.getenv("USE_PANDAS_CSV") == "0":
+            _load_csv_fast(path, conn, table_name)
+        elif importlib.util.find_spec("pyarrow") is not None:
+            _load_csv_arrow(path, conn, table_name)
+        else:
+            df = pd.read_csv(path)
+            df.to_sql(table_name, conn, index=False, if_exists="replace")
     elif file_type == "excel":
+        # openpyxl only reads .xlsx; legacy .xls goes through pandas (xlrd)
+        if Path(path).suffix.lower() == ".xlsx" and os.getenv("USE_PANDAS_EXCEL") != "1":
+            _load_excel_streaming(path, conn)
+            return
+
         # Load all sheets — each sheet becomes a separate table
         excel_file = pd.ExcelFile(path)
         for sheet_name in excel_file.sheet_names:
             df = pd.read_excel(excel_file, sheet_name=sheet_name)
-            safe_name = re.sub(r"\W+", "_", sheet_name).strip("_")
+            safe_name = _sheet_table_name(sheet_name)
             df.to_sql(safe_name, conn, index=False, if_exists="replace")
 
-    return conn
 
+def _sheet_table_name(sheet_name: str) -> str:
+    """Turn a sheet name into the table name it is loaded as."""
+    return _SAFE_NAME_RE.sub("_", sheet_name).strip("_")
+
+
+def quote_identifier(name: str) -> str:
+    """Quote an identifier for safe interpolation into generated SQL."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class ValidatedQuery(str):
+    """
+    SQL text that has passed validate_query (stripped, trailing ';' removed).
+
+    The execute functions trust it and skip re-validation, so a query can be
+    validated once and then run — or wrapped by derived_query — many times.
+    """
+
+    __slots__ = ()
+
+
+def derived_query(head: str, query: ValidatedQuery, tail: str = "") -> ValidatedQuery:
+    """
+    Build `head (query) tail` — generated SQL around an already-validated query.
+
+    `head` and `tail` must be trusted, code-generated SQL (identifiers quoted
+    with quote_identifier); connections still run with query_only.
+    """
+    return ValidatedQuery(f"{head} {as_subquery(query)} {tail}".rstrip())
+
+
+def as_subquery(sql: str) -> str:
+    """
+    Wrap a SELECT as a parenthesized subquery for a derived query.
+
+    A trailing ';' is dropped, and the body goes on its own lines so a
+    trailing -- comment can't swallow the closing parenthesis.
+    """
+    body = sql.strip().rstrip(";")
+    return f"(\n{body}\n)"
+
+
+def _create_table(
+    conn: sqlite3.Connection, table: str, columns: list[tuple[str, str]]
+) -> None:
+    """(Re)create `table` with the given (name, sqlite_type) columns."""
+    cols_sql = ", ".join(f"{quote_identifier(n)} {t}" for n, t in columns)
+    conn.execute(f"DROP TABLE IF EXISTS {quote_identifier(table)}")
+    conn.execute(f"CREATE TABLE {quote_identifier(table)} ({cols_sql})")
+
+
+def _insert_sql(table: str, n_cols: int) -> str:
+    """Build the prepared INSERT statement for a table with `n_cols` columns."""
+    placeholders = ", ".join("?" * n_cols)
+    return f"INSERT INTO {quote_identifier(table)} VALUES ({placeholders})"
+
+
+def _arrow_sqlite_type(arrow_type) -> str:
+    """Map an Arrow type to the SQLite column type pandas' to_sql would use."""
+    import pyarrow as pa
+
+    if pa.types.is_integer(arrow_type) or pa.types.is_boolean(arrow_type):
+        return "INTEGER"
+    if pa.types.is_floating(arrow_type):
+        return "REAL"
+    return "TEXT"
+
+
+def _pandas_header(cells) -> list[str]:
+    """
+    Column names from a header row, named and de-duplicated like pandas.
+
+    Blank cells become "Unnamed: <i>" and repeats get ".1", ".2", ... —
+    what read_csv/read_excel produce, and what a CREATE TABLE can hold.
+    """
+    names: list[str] = []
+    seen: dict[str, int] = {}
+    for i, cell in enumerate(cells):
+        name = f"Unnamed: {i}" if cell is None or cell == "" else str(cell)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+
+def _load_csv_arrow(path: str, conn: sqlite3.Connection, table_name: str) -> None:
+    """
+    Load a CSV into SQLite using PyArrow's multithreaded CSV reader.
+
+    The file is parsed into columnar record batches and each batch is
+    bulk-inserted with a single executemany, all in one transaction —
+    no intermediate DataFrame is built.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    table = pacsv.read_csv(
+        path, read_options=pacsv.ReadOptions(block_size=_ARROW_CSV_BLOCK_SIZE)
+    )
+    table = table.rename_columns(_pandas_header(table.column_names))
+
+    sqlite_types = [_arrow_sqlite_type(field.type) for field in table.schema]
+    # Dates, timestamps, decimals, ... are stored as text, as to_sql does
+    for i, (field, sqlite_type) in enumerate(zip(table.schema, sqlite_types)):
+        if sqlite_type == "TEXT" and not pa.types.is_string(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+
+    insert_sql = _insert_sql(table_name, table.num_columns)
+    with conn:
+        _create_table(conn, table_name, list(zip(table.column_names, sqlite_types)))
+        for batch in table.to_batches():
+            columns = [col.to_pylist() for col in batch.columns]
+            conn.executemany(insert_sql, zip(*columns))
+
+
+def _parse_csv_int(value: str) -> int:
+    """
+    Parse a plain decimal integer that fits SQLite's 64-bit INTEGER.
+
+    Stricter than int(): digit-grouping underscores, whitespace, and
+    out-of-range values raise ValueError.
+    """
+    if not _CSV_INT_RE.fullmatch(value):
+        raise ValueError(f"not an integer: {value!r}")
+    number = int(value)
+    if not _INT64_MIN <= number <= _INT64_MAX:
+        raise ValueError(f"integer out of range: {value!r}")
+    return number
+
+
+def _parse_csv_float(value: str) -> float:
+    """
+    Parse a plain decimal/exponent number; stricter than float() (no "1_0").
+
+    Integer text must still fit INTEGER's range, so a column of too-long
+    IDs sniffs as TEXT and keeps every digit instead of rounding to REAL.
+    """
+    if _CSV_INT_RE.fullmatch(value):
+        return float(_parse_csv_int(value))
+    if not _CSV_FLOAT_RE.fullmatch(value):
+        raise ValueError(f"not a number: {value!r}")
+    return float(value)
+
+
+def _sniff_sqlite_type(values) -> str:
+    """Pick INTEGER, REAL, or TEXT for a column from a sample of raw CSV strings."""
+    present = [v for v in values if v != ""]
+    if not present:
+        return "TEXT"
+    for sqlite_type, convert in (("INTEGER", _parse_csv_int), ("REAL", _parse_csv_float)):
+        try:
+            for value in present:
+                convert(value)
+        except ValueError:
+            continue
+        return sqlite_type
+    return "TEXT"
+
+
+def _csv_caster(sqlite_type: str):
+    """Return a function converting a raw CSV string to a value for `sqlite_type`."""
+    convert = {"INTEGER": _parse_csv_int, "REAL": _parse_csv_float}.get(sqlite_type)
+
+    def cast(value: str):
+        if value == "":
+            return None
+        if convert is None:
+            return value
+        try:
+            return convert(value)
+        except ValueError:
+            # Sniffing only saw the first rows; keep unexpected values as text
+            return value
+
+    return cast
+
+
+def _load_csv_fast(path: str, conn: sqlite3.Connection, table_name: str) -> None:
+    """
+    Stream a CSV into SQLite with the csv module — no pandas round-trip.
+
+    Column types are sniffed from the first rows; the file is then inserted
+    in fixed-size chunks within a single transaction, so memory stays
+    bounded by the chunk size rather than the file size.
+    """
+    with open(path, newline="", buffering=1 << 20, encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"CSV file is empty: '{path}'")
+        header = _pandas_header(header)
+        n_cols = len(header)
+
+        def padded(rows):
+            # Trailing empty fields are often omitted — pad short rows out
+            for row in rows:
+                yield row + [""] * (n_cols - len(row)) if len(row) < n_cols else row
+
+        sample = list(padded(itertools.islice(reader, _CSV_SNIFF_ROWS)))
+        sqlite_types = [
+            _sniff_sqlite_type(row[i] for row in sample) for i in range(n_cols)
+        ]
+        casters = [_csv_caster(t) for t in sqlite_types]
+
+        def typed(rows):
+            for row in rows:
+                yield tuple(cast(v) for cast, v in zip(casters, row))
+
+        insert_sql = _insert_sql(table_name, n_cols)
+        rows = itertools.chain(sample, padded(reader))
+        with conn:
+            _create_table(conn, table_name, list(zip(header, sqlite_types)))
+            while chunk := list(itertools.islice(rows, _CSV_CHUNK_ROWS)):
+                conn.executemany(insert_sql, typed(chunk))
+
+
+def _excel_sqlite_type(values) -> str:
+    """Pick the SQLite type pandas' to_sql would use for a sample of cell values."""
+    kinds = {type(v) for v in values if v is not None}
+    if not kinds:
+        return "TEXT"
+    if kinds <= {bool, int}:
+        return "INTEGER"
+    if kinds <= {bool, int, float}:
+        return "REAL"
+    if kinds == {datetime.datetime}:
+        return "TIMESTAMP"
+    return "TEXT"
+
+
+def _excel_value(value):
+    """Convert a cell value to something sqlite3 binds, as to_sql stores it."""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return str(value)
+    return value
+
+
+def _load_excel_streaming(path: str, conn: sqlite3.Connection) -> None:
+    """
+    Stream every sheet of an .xlsx workbook into SQLite via openpyxl.
+
+    The workbook is opened in read-only mode, so rows are parsed lazily
+    instead of building the whole sheet's XML tree. The first row is the
+    header, column types are sniffed from the first chunk, and rows are
+    inserted in fixed-size chunks within a single transaction.
+    """
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        with conn:
+            for ws in wb.worksheets:
+                _load_excel_sheet(ws, conn, _sheet_table_name(ws.title))
+    finally:
+        wb.close()  # read-only workbooks keep the file open until closed
+
+
+def _load_excel_sheet(ws, conn: sqlite3.Connection, table_name: str) -> None:
+    """Insert one read-only worksheet as `table_name` (empty sheets are skipped)."""
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None) or ()
+    # Read-only sheets report their full used range — drop unnamed trailing cells
+    while header and header[-1] is None:
+        header = header[:-1]
+    if not header:
+        logger.warning("excel_sheet_skipped", extra={"sheet": ws.title, "reason": "empty"})
+        return
+    columns = _pandas_header(header)
+    n_cols = len(columns)
+
+    def padded(rows):
+        for row in rows:
+            if all(cell is None for cell in row):
+                continue  # blank (often just formatted) rows
+            yield row[:n_cols] + (None,) * (n_cols - len(row))
+
+    rows = padded(rows)
+    chunk = list(itertools.islice(rows, _EXCEL_CHUNK_ROWS))
+    sqlite_types = [_excel_sqlite_type(row[i] for row in chunk) for i in range(n_cols)]
+    _create_table(conn, table_name, list(zip(columns, sqlite_types)))
+
+    insert_sql = _insert_sql(table_name, n_cols)
+    while chunk:
+        conn.executemany(insert_sql, (tuple(map(_excel_value, row)) for row in chunk))
+        chunk = list(itertools.islice(rows, _EXCEL_CHUNK_ROWS))
+
+
+def _invalidate_schema_cache() -> None:
+    """Drop the cached schema and bump the schema generation."""
+    global _schema_cache, _schema_generation
+    _schema_cache = None
+    _schema_generation += 1
 
-def _ensure_connected() -> sqlite3.Connection:
-    """Return the active connection, initializing if needed."""
-    if _connection is None:
-        init_db()
-    assert _connection is not None
-    return _connection
+
+def get_schema_version() -> tuple[int, int]:
+    """
+    Return a key that changes whenever the schema may have changed.
+
+    Combines the data-source generation with the database's PRAGMA
+    schema_version, so it moves on source swaps and on any DDL.
+    """
+    conn = _get_conn()
+    return _schema_generation, conn.execute("PRAGMA schema_version").fetchone()[0]
 
 
-def get_schema() -> dict[str, list[dict[str, str]]]:
+def get_schema() -> _Schema:
     """
     Get the database schema.
-    
+
+    The result is cached and rebuilt only when the data source or the
+    database's schema_version changes; it is built from immutable tuples,
+    so it can be shared freely.
+
     Returns:
-        Dictionary mapping table names to lists of column info dicts:
-        {"table_name": [{"name": "col", "type": "TEXT"}, ...]}
+        Dictionary mapping table names to parallel (names, types) tuples:
+        {"table_name": (("col", ...), ("TEXT", ...))}
     """
-    conn = _ensure_connected()
+    global _schema_cache
+    key = get_schema_version()
+    cached = _schema_cache
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with _schema_lock:
+        # Another thread may have rebuilt it while we waited
+        if _schema_cache is not None and _schema_cache[0] == key:
+            return _schema_cache[1]
+        schema = _introspect_schema(_get_conn())
+        _schema_cache = (key, schema)
+        return schema
+
+
+def _introspect_schema(conn: sqlite3.Connection) -> _Schema:
+    """Read every table's column names and types from the catalog."""
+    schema: _Schema = {}
     cursor = conn.cursor()
 
     # Get all table names
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
     tables = [row[0] for row in cursor.fetchall()]
 
-    schema: dict[str, list[dict[str, str]]] = {}
     for table in tables:
         cursor.execute(f"PRAGMA table_info('{table}')")
-        columns = [
-            {"name": row[1], "type": row[2] or "TEXT"}
-            for row in cursor.fetchall()
-        ]
-        schema[table] = columns
+        info = cursor.fetchall()
+        names = tuple(row[1] for row in info)
+        types = tuple(row[2] or "TEXT" for row in info)
+        schema[table] = (names, types)
 
     return schema
 
 
-def validate_query(sql: str) -> None:
+def _strip_literals_and_comments(sql: str) -> str:
+    """
+    Blank out string literals, quoted identifiers, and comments.
+
+    Each one is replaced by a single space in one regex pass, so keyword
+    scanning only ever sees real SQL tokens.
+    """
+    return _LITERALS_AND_COMMENTS_RE.sub(" ", sql)
+
+
+def _unquote_for_pragma_check(sql: str) -> str:
+    """Unwrap quoted names and blank out comments (see _QUOTED_OR_COMMENT_RE)."""
+
+    def unquote(match: re.Match) -> str:
+        quoted = next((g for g in match.groups() if g is not None), None)
+        return " " if quoted is None else quoted
+
+    return _QUOTED_OR_COMMENT_RE.sub(unquote, sql)
+
+
+def validate_query(sql: str) -> ValidatedQuery:
+    """
+    Validate that a SQL query is read-only.
+
+    String literals, quoted identifiers, and comments are stripped first;
+    the remaining text is then checked for a second statement after a ';'
+    and scanned once with a precompiled whole-word pattern for DML/DDL
+    keywords — including ones hidden inside subqueries or CTEs — and must
+    open with SELECT, WITH, EXPLAIN, PRAGMA, or VALUES. PRAGMAs must be one
+    of the read-only introspection pragmas (_READ_ONLY_PRAGMAS), without an
+    assignment: query_only, which connections run with, refuses data and
+    schema writes but not settings such as journal_mode.
+
+    Set SQLPARSE_VERIFY=1 to additionally run the sqlparse-based
+    reference validator (slower; for debugging).
+
+    Verdicts (accepted or rejected) are memoized per stripped query text.
+
+    Returns:
+        The query as a ValidatedQuery, which the execute functions run
+        without validating again.
+
+    Raises:
+        ValueError: If the query is not a safe read-only statement.
+    """
+    if isinstance(sql, ValidatedQuery):
+        return sql
+    stripped = sql.strip()
+    ok, error = _validate_cached(stripped, _SQLPARSE_VERIFY)
+    if not ok:
+        raise ValueError(error)
+    return ValidatedQuery(stripped.rstrip(";").rstrip())
+
+
+@functools.lru_cache(maxsize=1024)
+def _validate_cached(stripped: str, verify: bool) -> tuple[bool, str | None]:
+    """Memoized verdict as (ok, error message); `verify` is part of the key."""
+    try:
+        _check_query(stripped, verify)
+    except ValueError as e:
+        return False, str(e)
+    return True, None
+
+
+def _check_query(stripped: str, verify: bool) -> None:
+    """Run the validation checks on already-stripped SQL (uncached)."""
+    if not stripped:
+        raise ValueError("Empty query.")
+
+    if not _has_special_syntax(stripped):
+        # Fast path: nothing to blank out and no second statement possible
+        cleaned = stripped
+    else:
+        cleaned = _strip_literals_and_comments(stripped).strip()
+        if not cleaned:
+            raise ValueError("Empty query.")
+
+        # Block multi-statement payloads (e.g., "SELECT 1; DROP TABLE x")
+        _, semicolon, rest = cleaned.partition(";")
+        if semicolon and rest.strip():
+            raise ValueError(
+                "Multiple statements detected. Only a single query is allowed."
+            )
+
+    # Uppercase once, so the patterns below can match case-sensitively
+    cleaned = cleaned.upper()
+    if cleaned.startswith(("PRAGMA", "EXPLAIN")):
+        _check_pragma(stripped)
+
+    match = _DANGEROUS_RE.search(cleaned)
+    if match:
+        word = match.group(0).split()[0]
+        raise ValueError(
+            f"Query contains forbidden keyword: '{word}'. "
+            "Only read-only queries are allowed."
+        )
+
+    if not cleaned.startswith(_SAFE_PREFIXES):
+        raise ValueError(
+            "Only SELECT, WITH, EXPLAIN, PRAGMA, and VALUES statements are allowed."
+        )
+
+    if verify:
+        _validate_with_sqlparse(stripped)
+
+
+def _check_pragma(stripped: str) -> None:
+    """Reject a PRAGMA (or EXPLAIN PRAGMA) outside _READ_ONLY_PRAGMAS or with '='."""
+    match = _PRAGMA_RE.match(_unquote_for_pragma_check(stripped).upper())
+    if match is None:
+        return  # EXPLAIN of some other statement
+    name, assignment = match.group(1).lower(), match.group(2)
+    if name not in _READ_ONLY_PRAGMAS:
+        raise ValueError(
+            f"PRAGMA {name or '(none)'} is not allowed. Only read-only pragmas "
+            f"are: {', '.join(sorted(_READ_ONLY_PRAGMAS))}."
+        )
+    if assignment:
+        raise ValueError(f"PRAGMA {name} cannot be assigned.")
+
+
+def _has_special_syntax(sql: str) -> bool:
+    """Whether `sql` has quotes, brackets, comment openers, or ';' (substring scans)."""
+    return (
+        "'" in sql
+        or '"' in sql
+        or "`" in sql
+        or "[" in sql
+        or ";" in sql
+        or "--" in sql
+        or "/*" in sql
+    )
+
+
+def _validate_with_sqlparse(sql: str) -> None:
     """
-    Validate that a SQL query is read-only using AST-level parsing.
+    Reference validator using AST-level parsing (debug mode only).
 
     Uses sqlparse to parse the SQL into a token tree and walks every
     token to reject DML/DDL keywords — even when hidden inside
@@ -160,23 +864,18 @@ def validate_query(sql: str) -> None:
 
     # Walk the full token tree and reject any DML/DDL tokens.
     # This catches dangerous keywords hidden inside CTEs, subqueries,
-    # or queries that sqlparse classified as UNKNOWN.
-    _DANGEROUS_KEYWORDS = frozenset({
-        "INSERT", "UPDATE", "DELETE", "DROP", "ALTER",
-        "CREATE", "REPLACE", "ATTACH", "DETACH", "VACUUM",
-    })
-
-    def _walk_tokens(token_list):
-        """Recursively yield every leaf token in the tree."""
-        for token in token_list.tokens:
-            if token.is_group:
-                yield from _walk_tokens(token)
-            else:
-                yield token
-
-    for token in _walk_tokens(stmt):
-        # Check DML/DDL token types directly
-        if token.ttype is DML or token.ttype is DDL:
+    # or queries that sqlparse classified as UNKNOWN. Iterative (explicit
+    # stack, left-to-right) and stops at the first hit.
+    # DML/DDL token types, plus plain keywords (e.g., ATTACH, VACUUM)
+    keyword_types = frozenset({DML, DDL, Keyword})
+    stack = list(reversed(stmt.tokens))
+    while stack:
+        token = stack.pop()
+        if token.is_group:
+            stack.extend(reversed(token.tokens))
+            continue
+        # Cheap type check first; only keyword tokens are uppercased
+        if token.ttype in keyword_types:
             word = token.normalized.upper()
             if word in _DANGEROUS_KEYWORDS:
                 raise ValueError(
@@ -184,22 +883,50 @@ def validate_query(sql: str) -> None:
                     "Only read-only queries are allowed."
                 )
 
-        # Also check Keyword tokens (e.g., ATTACH, VACUUM)
-        if token.ttype is Keyword:
-            word = token.normalized.upper()
-            if word in _DANGEROUS_KEYWORDS:
-                raise ValueError(
-                    f"Query contains forbidden keyword: '{word}'. "
-                    "Only read-only queries are allowed."
-                )
+
+def execute_query_rows(
+    sql: str | ValidatedQuery, limit: int | None = None
+) -> tuple[list[str], list[tuple]]:
+    """
+    Execute a read-only SQL query and return the raw result rows.
+
+    This is the lightweight path for callers that only iterate rows
+    (e.g. markdown rendering) — no DataFrame is built.
+
+    Args:
+        sql: A SQL SELECT statement, or a ValidatedQuery (not re-validated).
+        limit: Stop stepping the statement after this many rows.
+
+    Returns:
+        Tuple of (column_names, rows), each row a tuple of values.
+
+    Raises:
+        ValueError: If the query is not read-only.
+    """
+    query = validate_query(sql)
+    t0 = time.perf_counter()
+    cursor = _execute(query)
+    columns = [d[0] for d in cursor.description] if cursor.description else []
+    if limit is None:
+        rows = cursor.fetchall()
+    else:
+        rows = cursor.fetchmany(limit)
+        cursor.close()  # finalize the statement now, not when collected
+    _log_query(len(rows), t0)
+    return columns, rows
 
 
-def execute_query(sql: str) -> pd.DataFrame:
+def execute_query(sql: str | ValidatedQuery, limit: int | None = None) -> "pd.DataFrame":
     """
     Execute a read-only SQL query and return results as a DataFrame.
 
+    Rows are fetched in chunks and appended straight into per-column
+    lists, so the full result never exists as a list of row tuples next
+    to the DataFrame built from it.
+
     Args:
-        sql: A SQL SELECT statement.
+        sql: A SQL SELECT statement, or a ValidatedQuery (not re-validated).
+        limit: Stop stepping the statement after this many rows.
         
     Returns:
         pandas DataFrame with the query results.
@@ -207,16 +934,182 @@ def execute_query(sql: str) -> pd.DataFrame:
     Raises:
         ValueError: If the query is not read-only.
     """
-    validate_query(sql)
-    conn = _ensure_connected()
+    query = validate_query(sql)
+    # PRAGMA/EXPLAIN results are small, and a PRAGMA write the engine blocks
+    # should surface through _execute's read-only error handling
+    if _adbc_enabled() and query[:6].upper().startswith(_ADBC_PREFIXES):
+        df = _execute_query_adbc(query, limit)
+        if df is not None:
+            return df
+
     t0 = time.perf_counter()
-    df = pd.read_sql_query(sql, conn)
+    cursor = _execute(query)
+    names = [d[0] for d in cursor.description] if cursor.description else []
+    columns: list[list] = [[] for _ in names]
+    n_rows = 0
+    remaining = limit
+    while chunk := cursor.fetchmany(
+        _FETCH_CHUNK_ROWS if remaining is None else min(_FETCH_CHUNK_ROWS, remaining)
+    ):
+        n_rows += len(chunk)
+        for column, values in zip(columns, zip(*chunk)):
+            column.extend(values)
+        if remaining is not None:
+            remaining -= len(chunk)
+            if remaining <= 0:
+                break
+    cursor.close()  # finalize the statement now, even when stopped early
+    _log_query(n_rows, t0)
+
+    # Only now — rejected or failing SQL never pays for the pandas import
+    import pandas as pd
+
+    # Positional keys, then the real names: duplicate column names survive
+    df = pd.DataFrame(dict(enumerate(columns)))
+    df.columns = names
+    _categorize_text_columns(df)
+    return df
+
+
+def _categorize_text_columns(df: "pd.DataFrame") -> None:
+    """
+    Convert repetitive text columns to categoricals, in place.
+
+    Each distinct string is stored once and rows hold small integer codes,
+    which shrinks the frame and speeds up grouping.
+    """
+    from pandas.api.types import is_object_dtype, is_string_dtype
+
+    n_rows = len(df)
+    if n_rows == 0:
+        return
+    for i in range(df.shape[1]):  # positional — names may repeat
+        column = df.iloc[:, i]
+        if not (is_string_dtype(column.dtype) or is_object_dtype(column.dtype)):
+            continue
+        if column.nunique(dropna=False) / n_rows < _CATEGORY_MAX_RATIO:
+            df.isetitem(i, column.astype("category"))
+
+
+def _adbc_enabled() -> bool:
+    """
+    Whether execute_query should read results through ADBC.
+
+    Only for a file-backed database the module opened itself: ADBC opens
+    its own connection, which can't see a shared in-memory database or a
+    caller's connection. Set USE_ADBC=0 to always use sqlite3.
+    """
+    return (
+        _file_backed
+        and _shared_connection is None
+        and os.getenv("USE_ADBC") != "0"
+        and _adbc_installed()
+    )
+
+
+@functools.cache
+def _adbc_installed() -> bool:
+    """Whether the optional ADBC SQLite driver (and PyArrow) can be imported."""
+    return all(
+        importlib.util.find_spec(name) is not None
+        for name in ("adbc_driver_sqlite", "pyarrow")
+    )
+
+
+def _execute_query_adbc(
+    query: ValidatedQuery, limit: int | None = None
+) -> "pd.DataFrame | None":
+    """
+    Run validated SQL through the ADBC SQLite driver into Arrow buffers.
+
+    Cells are decoded straight into Arrow columns and handed to pandas as
+    Arrow-backed dtypes, so no Python object is built per value. Returns
+    None if the driver reports an error (e.g. a column mixing storage
+    classes it can't put in one Arrow array); the caller then falls back to
+    sqlite3. Anything else is a bug and propagates.
+    """
+    from adbc_driver_sqlite import dbapi
+
+    t0 = time.perf_counter()
+    try:
+        cursor = _get_adbc_conn().cursor()
+        try:
+            cursor.execute(str(query))  # the driver accepts exact str only
+            if limit is None:
+                table = cursor.fetch_arrow_table()
+            else:
+                table = _read_arrow_batches(cursor.fetch_record_batch(), limit)
+        finally:
+            cursor.close()
+    except dbapi.Error as e:
+        logger.debug("adbc_fallback", extra={"error": f"{type(e).__name__}: {e}"})
+        return None
+    _log_query(table.num_rows, t0)
+
+    import pandas as pd
+
+    # Positional names for the conversion, then the real ones: duplicate
+    # column names survive, as on the sqlite3 path
+    names = table.column_names
+    df = table.rename_columns([str(i) for i in range(len(names))]).to_pandas(
+        types_mapper=pd.ArrowDtype
+    )
+    df.columns = names
+    _categorize_text_columns(df)
+    return df
+
+
+def _read_arrow_batches(reader, limit: int):
+    """Read record batches until `limit` rows are in, as one Arrow table."""
+    import pyarrow as pa
+
+    batches = []
+    n_rows = 0
+    for batch in reader:
+        batches.append(batch)
+        n_rows += batch.num_rows
+        if n_rows >= limit:
+            break
+    return pa.Table.from_batches(batches, schema=reader.schema).slice(0, limit)
+
+
+def _get_adbc_conn():
+    """Return the calling thread's ADBC connection, opening it on first use."""
+    conn = getattr(_TLS, "adbc_conn", None)
+    if conn is not None and _TLS.adbc_generation == _generation:
+        return conn
+
+    from adbc_driver_sqlite import dbapi
+
+    # Read-only at open time; autocommit, so no long-lived read snapshot
+    conn = dbapi.connect(f"{Path(_database).resolve().as_uri()}?mode=ro", autocommit=True)
+    with _connections_lock:
+        _owned_connections.append(conn)
+        _TLS.adbc_conn, _TLS.adbc_generation = conn, _generation
+    return conn
+
+
+def _execute(query: ValidatedQuery) -> sqlite3.Cursor:
+    """Run validated SQL on this thread's connection."""
+    try:
+        return _get_conn().execute(query)
+    except sqlite3.OperationalError as e:
+        # query_only is the authoritative gate: surface writes it blocked
+        # (e.g. PRAGMA user_version=1) as rejections, like validate_query's
+        if "readonly database" in str(e):
+            raise ValueError(
+                "Query attempted to write. Only read-only queries are allowed."
+            ) from e
+        raise
+
+
+def _log_query(n_rows: int, t0: float) -> None:
+    """Emit the query_executed event for a query started at `t0`."""
     elapsed_ms = (time.perf_counter() - t0) * 1000
     logger.info(
         "query_executed",
-        extra={"rows": len(df), "elapsed_ms": round(elapsed_ms, 2)},
+        extra={"rows": n_rows, "elapsed_ms": round(elapsed_ms, 2)},
     )
-    return df
 
 
 def get_data_source_info() -> str:
@@ -8,19 +8,25 @@ to emit structured JSON lines to stderr.
 import logging
 import sys
 
-from pythonjsonlogger import json as json_logger
+_LEVELS = {
+    name: getattr(logging, name)
+    for name in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+}
 
 
 def setup_logging(level: str = "INFO") -> None:
     """Configure the root logger to output structured JSON."""
+    from pythonjsonlogger import json as json_logger
+
     handler = logging.StreamHandler(sys.stderr)
     formatter = json_logger.JsonFormatter(
         fmt="%(asctime)s %(levelname)s %(name)s %(message)s",
         rename_fields={"asctime": "timestamp", "levelname": "level", "name": "module"},
+        json_ensure_ascii=False,  # keep non-ASCII data (names, SQL) unescaped
     )
     handler.setFormatter(formatter)
 
     root = logging.getLogger()
     root.handlers.clear()
     root.addHandler(handler)
-    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+    root.setLevel(_LEVELS.get(level.upper(), logging.INFO))
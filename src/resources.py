@@ -2,35 +2,45 @@
 MCP Resources — expose database schema as context for the LLM.
 """
 
-from src.db import get_schema, get_data_source_info
+import functools
+
+from src.db import get_schema, get_data_source_info, get_schema_version
+
+# Column table header shared by every table section
+_TABLE_HEADER = ("| Column | Type |", "|--------|------|")
 
 
 def format_schema() -> str:
     """
     Format the database schema as a readable string for the LLM.
-    
+
+    The rendered text is cached per schema version, so repeated resource
+    reads and get_schema tool calls skip the re-render.
+
     Returns:
         Markdown-formatted schema description.
     """
+    return _render_schema(get_schema_version())
+
+
+@functools.lru_cache(maxsize=1)
+def _render_schema(version: tuple[int, int]) -> str:
+    """Render the schema markdown; `version` is only the cache key."""
     schema = get_schema()
     source_info = get_data_source_info()
 
-    lines = [
-        f"# Database Schema",
-        f"",
-        f"{source_info}",
-        f"",
+    parts = [
+        "# Database Schema",
+        "",
+        source_info,
+        "",
         f"## Tables ({len(schema)})",
-        f"",
+        "",
     ]
 
-    for table_name, columns in schema.items():
-        lines.append(f"### `{table_name}`")
-        lines.append("")
-        lines.append("| Column | Type |")
-        lines.append("|--------|------|")
-        for col in columns:
-            lines.append(f"| `{col['name']}` | {col['type']} |")
-        lines.append("")
+    for table_name, (names, types) in schema.items():
+        parts.extend((f"### `{table_name}`", "", *_TABLE_HEADER))
+        parts.extend(f"| `{name}` | {typ} |" for name, typ in zip(names, types))
+        parts.append("")
 
-    return "\n".join(lines)
+    return "\n".join(parts)
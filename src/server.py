@@ -8,6 +8,7 @@ An MCP server that connects to databases or data files and provides:
 """
 
 import logging
+import threading
 
 from mcp.server.fastmcp import FastMCP
 
@@ -15,7 +16,7 @@ from src.db import init_db
 from src.logging_config import setup_logging
 from src.resources import format_schema
 from src.tools.query import run_read_only_query_tool
-from src.tools.visualize import visualize_data_tool
+from src.tools.visualize import visualize_data_tool, warm_up
 
 logger = logging.getLogger(__name__)
 
@@ -61,7 +62,8 @@ def run_read_only_query(sql: str) -> str:
     Args:
         sql: A SQL SELECT statement (e.g., "SELECT * FROM employees LIMIT 10")
     """
-    logger.info("tool_invoked", extra={"tool": "run_read_only_query", "sql": sql[:200]})
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("tool_invoked", extra={"tool": "run_read_only_query", "sql": sql[:200]})
     return run_read_only_query_tool(sql)
 
 
@@ -88,10 +90,11 @@ def visualize_data(
         y_column: Column name for the Y axis. Auto-detected if not specified.
         title: Title for the chart. Default: "Chart".
     """
-    logger.info(
-        "tool_invoked",
-        extra={"tool": "visualize_data", "chart_type": chart_type, "sql": sql[:200]},
-    )
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "tool_invoked",
+            extra={"tool": "visualize_data", "chart_type": chart_type, "sql": sql[:200]},
+        )
     text_summary, img_base64 = visualize_data_tool(
         sql, chart_type, x_column, y_column, title
     )
@@ -111,6 +114,8 @@ def main():
     """Main entry point for the MCP server."""
     setup_logging()
     init_db()
+    # Load matplotlib and build its font cache while the client connects
+    threading.Thread(target=warm_up, name="viz-warm-up", daemon=True).start()
     logger.info("server_started")
     mcp.run()
 
@@ -0,0 +1,29 @@
+"""
+Markdown rendering shared by the tools.
+"""
+
+
+def format_cell(value) -> str:
+    """Format a single cell for a markdown table (floats to 6 significant digits)."""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return "" if value != value else f"{value:.6g}"  # NaN -> empty cell
+    return str(value)
+
+
+def rows_to_markdown(columns: list[str], rows: list[tuple]) -> str:
+    """
+    Render rows as a pipe-delimited markdown table.
+
+    A direct join over the rows — no per-column width pass or padding
+    like tabulate, which is unnecessary for markdown that gets rendered.
+    Cells go through map() rather than a generator, so no Python frame is
+    resumed per value.
+    """
+    lines = [
+        "| " + " | ".join(map(str, columns)) + " |",
+        "|" + "|".join(["---"] * len(columns)) + "|",
+    ]
+    lines.extend([f"| {' | '.join(map(format_cell, row))} |" for row in rows])
+    return "\n".join(lines)
@@ -5,11 +5,16 @@ Allows the LLM to execute safe, read-only SQL queries against the database.
 """
 
 import logging
+import sqlite3
 
-from src.db import execute_query
+from src.db import ValidatedQuery, derived_query, execute_query_rows, validate_query
+from src.tools.formatting import rows_to_markdown
 
 logger = logging.getLogger(__name__)
 
+# Cap output at this many rows to avoid overwhelming the context
+MAX_DISPLAY_ROWS = 100
+
 
 def run_read_only_query_tool(sql: str) -> str:
     """
@@ -22,7 +27,8 @@ def run_read_only_query_tool(sql: str) -> str:
         Query results formatted as a markdown table, or an error message.
     """
     try:
-        df = execute_query(sql)
+        query = validate_query(sql)
+        columns, rows, total_rows = _fetch_page(query)
     except ValueError as e:
         logger.warning("query_rejected", extra={"error": str(e)})
         return f"❌ **Query Rejected**: {e}"
@@ -30,20 +36,36 @@ def run_read_only_query_tool(sql: str) -> str:
         logger.error("query_error", extra={"error": f"{type(e).__name__}: {e}"})
         return f"❌ **Query Error**: {type(e).__name__}: {e}"
 
-    if df.empty:
+    if not rows:
         return "ℹ️ Query returned no results."
 
-    total_rows = len(df)
+    parts = [f"**Results** ({total_rows} rows):", "", rows_to_markdown(columns, rows)]
+    if total_rows > MAX_DISPLAY_ROWS:
+        parts += ["", f"> ⚠️ Showing first {MAX_DISPLAY_ROWS} of {total_rows} total rows."]
+    return "\n".join(parts)
+
 
-    # Cap output at 100 rows to avoid overwhelming the context
-    if total_rows > 100:
-        df = df.head(100)
-        truncation_note = f"\n\n> ⚠️ Showing first 100 of {total_rows} total rows."
-    else:
-        truncation_note = ""
+def _fetch_page(query: ValidatedQuery) -> tuple[list[str], list[tuple], int]:
+    """
+    Fetch the rows to display and the result's total row count.
 
-    # Format as markdown table
-    result = df.to_markdown(index=False)
-    header = f"**Results** ({total_rows} rows):\n\n"
+    The statement itself stops after one row past the display cap, so its
+    column names are exactly what the SQL says. COUNT(*) runs only when
+    that extra row shows up; a statement that can't be used as a subquery
+    (PRAGMA, EXPLAIN, ...) is counted by running it in full instead.
 
-    return header + result + truncation_note
+    Returns:
+        Tuple of (column_names, at most MAX_DISPLAY_ROWS rows, total rows).
+    """
+    columns, rows = execute_query_rows(query, limit=MAX_DISPLAY_ROWS + 1)
+    if len(rows) <= MAX_DISPLAY_ROWS:
+        return columns, rows, len(rows)
+
+    try:
+        _, count = execute_query_rows(derived_query("SELECT COUNT(*) FROM", query))
+        total_rows = count[0][0]
+    except sqlite3.OperationalError as e:
+        if "syntax error" not in str(e):
+            raise
+        total_rows = len(execute_query_rows(query)[1])
+    return columns, rows[:MAX_DISPLAY_ROWS], total_rows
@@ -2,24 +2,61 @@
 Tool: visualize_data
 
 Generates charts and summary statistics from SQL query results.
-Uses matplotlib for rendering and returns base64-encoded PNG images.
+Uses matplotlib for rendering and returns base64-encoded PNG images
+(encoded straight from the Agg canvas buffer with Pillow).
 """
 
 import io
 import base64
+import hashlib
 import logging
+import math
+import sqlite3
+import threading
+import warnings
+from collections import OrderedDict
+from typing import TYPE_CHECKING
 
-import matplotlib
-matplotlib.use("Agg")  # Non-interactive backend
-import matplotlib.pyplot as plt
-import matplotlib.ticker as ticker
+from src.db import (
+    ValidatedQuery,
+    derived_query,
+    execute_query,
+    execute_query_rows,
+    get_schema_version,
+    quote_identifier,
+    validate_query,
+)
+from src.tools.formatting import rows_to_markdown
 
-from src.db import execute_query
+# matplotlib (~1s to import), NumPy, Pillow, and pandas are imported on first
+# use, so sessions that never visualize don't pay for them
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
 SUPPORTED_CHART_TYPES = ["bar", "line", "scatter", "pie", "hist"]
 
+# Results with more rows than this are summarized by SQLite's aggregate
+# functions instead of pandas, and bar/pie data is pre-aggregated there
+_LARGE_RESULT_ROWS = 10_000
+_MAX_AGGREGATED_GROUPS = 1000
+_AGGREGATED_CHART_TYPES = ("bar", "pie")
+
+# One figure (and its Agg canvas/renderer) per thread, created on that
+# thread's first render and reused instead of being rebuilt. Figures are
+# built without pyplot, so there is no global figure manager, and with one
+# per thread concurrent renders need no lock.
+_THREAD_FIGURE = threading.local()
+_mpl_initialized = False
+_MPL_INIT_LOCK = threading.Lock()
+
+# Successful results, most recently used last, keyed by a digest of the
+# request and schema version
+_RESULT_CACHE_SIZE = 64
+_result_cache: OrderedDict[bytes, tuple[str, str]] = OrderedDict()
+_result_cache_lock = threading.Lock()
+
 
 def visualize_data_tool(
     sql: str,
@@ -40,10 +77,67 @@ def visualize_data_tool(
     
     Returns:
         Tuple of (text_summary, base64_png_or_none).
+
+    Successful results are memoized per (sql, chart, columns, title) and
+    schema version, so identical retries skip the query and the render.
     """
-    # Execute the query
+    sql = sql.strip()
+    chart_type = chart_type.lower().strip()
+
+    # Validate chart type — before the database is touched at all
+    if chart_type not in SUPPORTED_CHART_TYPES:
+        return (
+            f"❌ Unsupported chart type: '{chart_type}'. "
+            f"Choose from: {', '.join(SUPPORTED_CHART_TYPES)}",
+            None,
+        )
+
     try:
-        df = execute_query(sql)
+        version = get_schema_version()
+    except Exception as e:
+        # e.g. an unreadable data source: skip the cache and let _visualize
+        # report the error like any other query failure
+        logger.warning("viz_cache_skipped", extra={"error": f"{type(e).__name__}: {e}"})
+        return _visualize(sql, chart_type, x_column, y_column, title)
+
+    key = _cache_key(sql, chart_type, x_column, y_column, title, version)
+    with _result_cache_lock:
+        cached = _result_cache.get(key)
+        if cached is not None:
+            _result_cache.move_to_end(key)
+            return cached
+
+    result = _visualize(sql, chart_type, x_column, y_column, title)
+    if result[1] is None:
+        return result  # Don't memoize failures — a retry should really retry
+
+    with _result_cache_lock:
+        _result_cache[key] = result
+        _result_cache.move_to_end(key)
+        while len(_result_cache) > _RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+    return result
+
+
+def _cache_key(*parts) -> bytes:
+    """Digest the request parameters into a compact, fixed-size cache key."""
+    text = "\x1f".join(map(repr, parts))  # repr keeps None distinct from "None"
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def _visualize(
+    sql: str,
+    chart_type: str,
+    x_column: str | None,
+    y_column: str | None,
+    title: str,
+) -> tuple[str, str | None]:
+    """Run the query, render the chart, and build the summary (uncached)."""
+    # Execute the query — through a bounded preview, so a huge result is
+    # never materialized just to detect it
+    try:
+        query = validate_query(sql)  # once — derived queries below reuse it
+        df = execute_query(query, limit=_LARGE_RESULT_ROWS + 1)
     except ValueError as e:
         logger.warning("viz_query_rejected", extra={"error": str(e)})
         return f"❌ **Query Rejected**: {e}", None
@@ -54,15 +148,6 @@ def visualize_data_tool(
     if df.empty:
         return "ℹ️ Query returned no results — nothing to visualize.", None
 
-    # Validate chart type
-    chart_type = chart_type.lower().strip()
-    if chart_type not in SUPPORTED_CHART_TYPES:
-        return (
-            f"❌ Unsupported chart type: '{chart_type}'. "
-            f"Choose from: {', '.join(SUPPORTED_CHART_TYPES)}",
-            None,
-        )
-
     # Auto-detect columns if not specified
     if x_column is None:
         x_column = df.columns[0]
@@ -77,6 +162,27 @@ def visualize_data_tool(
     if y_column and y_column not in df.columns:
         return f"❌ Column '{y_column}' not found. Available: {list(df.columns)}", None
 
+    numeric_cols = list(df.select_dtypes(include="number").columns)
+    aggregated = False
+    try:
+        summarize_in_sql = len(df) > _LARGE_RESULT_ROWS and _can_wrap(query)
+        if summarize_in_sql:
+            # Large result: summarize in SQLite; bar/pie only need per-x totals
+            stats, total_rows = _sql_summary(query, numeric_cols, df)
+            if chart_type in _AGGREGATED_CHART_TYPES and y_column in numeric_cols:
+                df = _aggregate_by_x(query, x_column, y_column)
+                aggregated = True
+            else:
+                df = execute_query(query)
+        elif len(df) > _LARGE_RESULT_ROWS:
+            df = execute_query(query)  # unwrappable (PRAGMA, ...): fetch it all
+    except Exception as e:
+        logger.error("viz_query_error", extra={"error": f"{type(e).__name__}: {e}"})
+        return f"❌ **Query Error**: {type(e).__name__}: {e}", None
+    if not summarize_in_sql:
+        stats = _describe(df, numeric_cols) if numeric_cols else None
+        total_rows = len(df)
+
     # Generate the chart
     try:
         img_base64 = _render_chart(df, chart_type, x_column, y_column, title)
@@ -86,7 +192,11 @@ def visualize_data_tool(
 
     logger.info(
         "chart_generated",
-        extra={"chart_type": chart_type, "data_points": len(df), "image_bytes": len(img_base64)},
+        extra={
+            "chart_type": chart_type,
+            "data_points": total_rows,
+            "image_bytes": len(img_base64),
+        },
     )
 
     # Generate summary statistics
@@ -94,37 +204,233 @@ def visualize_data_tool(
         f"## 📊 Chart: {title}",
         f"",
         f"- **Chart type**: {chart_type}",
-        f"- **Data points**: {len(df)} rows",
+        f"- **Data points**: {total_rows} rows",
         f"- **X axis**: `{x_column}`",
     ]
     if y_column:
         summary_lines.append(f"- **Y axis**: `{y_column}`")
+    if aggregated:
+        summary_lines.append(
+            f"- **Aggregated**: SUM(`{y_column}`) by `{x_column}` "
+            f"(top {len(df)} groups)"
+        )
 
     # Add summary statistics for numeric columns
-    numeric_df = df.select_dtypes(include="number")
-    if not numeric_df.empty:
+    if stats is not None:
         summary_lines.append("")
         summary_lines.append("### Summary Statistics")
         summary_lines.append("")
-        summary_lines.append(numeric_df.describe().to_markdown())
+        summary_lines.append(rows_to_markdown(["", *numeric_cols], stats))
 
     return "\n".join(summary_lines), img_base64
 
 
+def _can_wrap(query: ValidatedQuery) -> bool:
+    """
+    Whether the statement can be used as a subquery by the SQL summaries.
+
+    PRAGMA, EXPLAIN, ... can't; SQLite rejects them as a syntax error when
+    the (empty) LIMIT 0 probe is prepared.
+    """
+    try:
+        execute_query_rows(derived_query("SELECT * FROM", query, "LIMIT 0"))
+    except sqlite3.OperationalError as e:
+        if "syntax error" in str(e):
+            return False
+        raise
+    return True
+
+
+def _describe(df: "pd.DataFrame", columns: list[str]) -> list[tuple]:
+    """
+    Compute describe()-style statistics for `columns` with NumPy.
+
+    The columns are copied once into a 2-D float array and every statistic
+    is one reduction along axis 0 — a single nanpercentile call yields min,
+    quartiles, and max for all columns. NaNs are skipped as in pandas (std
+    uses ddof=1).
+
+    Returns:
+        Stat rows — (label, value per column) — for rows_to_markdown.
+    """
+    import numpy as np
+
+    # Positional selection: df[columns] would repeat duplicate-named columns
+    wanted = set(columns)
+    positions = [i for i, name in enumerate(df.columns) if name in wanted]
+    a = df.iloc[:, positions].to_numpy(dtype=float, na_value=np.nan)
+    counts = np.count_nonzero(~np.isnan(a), axis=0)
+    with warnings.catch_warnings():
+        # All-NaN or single-value columns yield NaN, as in describe()
+        warnings.simplefilter("ignore", RuntimeWarning)
+        quantiles = np.nanpercentile(a, [0, 25, 50, 75, 100], axis=0)
+        mean = np.nanmean(a, axis=0)
+        std = np.nanstd(a, ddof=1, axis=0)
+    std[counts < 2] = np.nan
+
+    rows = [("count", *counts.tolist()), ("mean", *mean.tolist()), ("std", *std.tolist())]
+    for label, values in zip(["min", "25%", "50%", "75%", "max"], quantiles):
+        rows.append((label, *values.tolist()))
+    return rows
+
+
+def _sql_summary(
+    query: ValidatedQuery, columns: list[str], sample: "pd.DataFrame"
+) -> "tuple[list[tuple] | None, int]":
+    """
+    Compute count/mean/std/min/max per column with SQLite aggregates.
+
+    One pass over the full result, with no rows sent to Python. Sums are
+    shifted by the sample mean, which keeps the variance numerically stable.
+
+    Returns:
+        Tuple of (stat rows or None if no columns, total row count).
+    """
+    exprs = ["COUNT(*)"]
+    shifts = []
+    for col in columns:
+        shift = float(sample[col].mean())
+        shift = 0.0 if math.isnan(shift) else shift
+        shifts.append(shift)
+        q = quote_identifier(col)
+        d = f"({q} - {shift!r})"
+        exprs += [f"COUNT({q})", f"SUM({d})", f"SUM({d} * {d})", f"MIN({q})", f"MAX({q})"]
+
+    _, rows = execute_query_rows(derived_query(f"SELECT {', '.join(exprs)} FROM", query))
+    total, *values = rows[0]
+    if not columns:
+        return None, total
+
+    stats = []
+    for i, shift in enumerate(shifts):
+        n, s1, s2, lo, hi = values[5 * i : 5 * i + 5]
+        if n:
+            mean = shift + s1 / n
+            var = (s2 - s1 * s1 / n) / (n - 1) if n > 1 else math.nan
+            std = math.sqrt(max(var, 0.0)) if n > 1 else math.nan
+        else:
+            mean = std = math.nan
+        stats.append([n, mean, std, lo, hi])
+    labels = ["count", "mean", "std", "min", "max"]
+    return [(label, *values) for label, *values in zip(labels, *stats)], total
+
+
+def _aggregate_by_x(query: ValidatedQuery, x_col: str, y_col: str) -> "pd.DataFrame":
+    """Sum `y_col` per distinct `x_col` in SQLite, keeping the largest groups."""
+    x, y = quote_identifier(x_col), quote_identifier(y_col)
+    return execute_query(
+        derived_query(
+            f"SELECT {x}, SUM({y}) AS {y} FROM",
+            query,
+            f"GROUP BY {x} ORDER BY 2 DESC LIMIT {_MAX_AGGREGATED_GROUPS}",
+        )
+    )
+
+
 def _render_chart(
     df, chart_type: str, x_col: str, y_col: str | None, title: str
 ) -> str:
     """Render the chart and return a base64-encoded PNG string."""
-    fig, ax = plt.subplots(figsize=(10, 6))
+    df = _numpy_backed(df)
+    fig = _thread_figure()
+    # Fresh axes each time: Axes.clear() keeps state some charts set
+    # (pie turns the frame off and fixes the aspect ratio)
+    fig.clear()
+    ax = fig.add_subplot()
+    return _draw(fig, ax, df, chart_type, x_col, y_col, title)
 
-    # Apply a clean style
-    plt.style.use("seaborn-v0_8-darkgrid")
+
+def _numpy_backed(df: "pd.DataFrame") -> "pd.DataFrame":
+    """
+    Convert Arrow-backed columns (the ADBC readout) to NumPy dtypes.
+
+    matplotlib coerces values with float() and chokes on pd.NA, so NULLs
+    become NaN in numeric columns (ints with NULLs turn float, as on the
+    sqlite3 path) and None elsewhere. Other columns are left untouched.
+    """
+    import numpy as np
+    import pandas as pd
+    from pandas.api.types import is_numeric_dtype
+
+    arrow = [i for i, dtype in enumerate(df.dtypes) if isinstance(dtype, pd.ArrowDtype)]
+    if not arrow:
+        return df
+    df = df.copy(deep=False)
+    for i in arrow:
+        column = df.iloc[:, i]
+        if not is_numeric_dtype(column.dtype):
+            values = column.to_numpy(dtype=object, na_value=None)
+        elif column.hasnans:
+            values = column.to_numpy(dtype=float, na_value=np.nan)
+        else:
+            values = column.to_numpy(dtype=column.dtype.numpy_dtype)
+        df.isetitem(i, values)
+    return df
+
+
+def warm_up() -> None:
+    """
+    Pay matplotlib's one-time costs before the first real chart request.
+
+    Imports the plotting stack, loads the style, and draws a throwaway bar
+    chart, which builds the font cache and primes text layout and PNG
+    encoding. Meant to run in a background thread at server start; a
+    failure is logged and the first real render simply pays the cost.
+    """
+    import pandas as pd
+
+    try:
+        _render_chart(pd.DataFrame({"x": ["a"], "y": [1]}), "bar", "x", "y", "warm-up")
+    except Exception as e:
+        logger.warning("viz_warm_up_failed", extra={"error": f"{type(e).__name__}: {e}"})
+    else:
+        logger.debug("viz_warmed_up")
+
+
+def _thread_figure():
+    """Return the calling thread's figure, building it on first use."""
+    fig = getattr(_THREAD_FIGURE, "fig", None)
+    if fig is None:
+        _init_matplotlib()
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=(10, 6), dpi=96)
+        FigureCanvasAgg(fig)  # attaches itself as fig.canvas
+        _THREAD_FIGURE.fig = fig
+    return fig
+
+
+def _init_matplotlib() -> None:
+    """Import matplotlib and load the style — once per process."""
+    global _mpl_initialized
+    with _MPL_INIT_LOCK:
+        if _mpl_initialized:
+            return
+
+        import matplotlib.style
+
+        # Load the style sheet (into rcParams) once, not on every render
+        matplotlib.style.use("seaborn-v0_8-darkgrid")
+        _mpl_initialized = True
+
+
+def _draw(
+    fig, ax, df, chart_type: str, x_col: str, y_col: str | None, title: str
+) -> str:
+    """Draw onto the given axes and return the figure as base64 PNG."""
+    import matplotlib
+    import numpy as np
+    from PIL import Image
 
     if chart_type == "bar":
-        ax.bar(df[x_col].astype(str), df[y_col], color="#4C72B0", edgecolor="white")
+        # Numeric positions with fixed tick labels, instead of the categorical
+        # axis converter and locator pass over string x values
+        positions = np.arange(len(df))
+        ax.bar(positions, df[y_col], color="#4C72B0", edgecolor="white")
+        ax.set_xticks(positions, df[x_col].astype(str).tolist(), rotation=45, ha="right")
         ax.set_xlabel(x_col)
         ax.set_ylabel(y_col)
-        plt.xticks(rotation=45, ha="right")
 
     elif chart_type == "line":
         ax.plot(df[x_col], df[y_col], marker="o", linewidth=2, color="#4C72B0")
@@ -138,10 +444,12 @@ def _render_chart(
         ax.set_ylabel(y_col)
 
     elif chart_type == "pie":
-        values = df[y_col] if y_col else df[df.columns[1]]
-        labels = df[x_col].astype(str)
-        colors = plt.cm.Set3.colors[:len(values)]
-        ax.pie(values, labels=labels, autopct="%1.1f%%", colors=colors, startangle=90)
+        values = (df[y_col] if y_col else df[df.columns[1]]).to_numpy(dtype=float)
+        pcts = values / values.sum() * 100
+        # Percentages baked into the labels — no per-wedge autopct texts
+        labels = [f"{label}\n{pct:.1f}%" for label, pct in zip(df[x_col].astype(str), pcts)]
+        colors = matplotlib.colormaps["Set3"].colors[:len(values)]
+        ax.pie(values, labels=labels, autopct=None, colors=colors, startangle=90)
         ax.set_aspect("equal")
 
     elif chart_type == "hist":
@@ -153,10 +461,16 @@ def _render_chart(
     ax.set_title(title, fontsize=14, fontweight="bold", pad=15)
     fig.tight_layout()
 
-    # Encode to base64
+    # Rasterize once and PNG-encode the canvas buffer directly; tight_layout
+    # above already fits the margins, and fast zlib level is plenty here
+    fig.canvas.draw()
+    # frombuffer wraps the RGBA memory without copying; getbuffer() hands the
+    # PNG bytes to the encoder without the copy getvalue() would make
+    width, height = fig.canvas.get_width_height()
+    image = Image.frombuffer(
+        "RGBA", (width, height), fig.canvas.buffer_rgba(), "raw", "RGBA", 0, 1
+    )
     buffer = io.BytesIO()
-    fig.savefig(buffer, format="png", dpi=150, bbox_inches="tight")
-    plt.close(fig)
-    buffer.seek(0)
+    image.save(buffer, format="PNG", optimize=False, compress_level=1)
 
-    return base64.standard_b64encode(buffer.read()).decode("utf-8")
+    return base64.b64encode(buffer.getbuffer()).decode("ascii")
@@ -16,8 +16,7 @@ print("=" * 60)
 print("TEST 2: Schema retrieval")
 print("=" * 60)
 schema = get_schema()
-for table, cols in schema.items():
-    col_names = [c["name"] for c in cols]
+for table, (col_names, _) in schema.items():
     print(f"  📋 {table}: {col_names}")
 print(f"  ✅ Found {len(schema)} tables")
 
@@ -8,20 +8,34 @@ import src.db as db_module
 
 @pytest.fixture(autouse=True)
 def _reset_db():
-    """Reset the module-level DB connection before/after each test."""
-    db_module._connection = None
-    db_module._data_source_path = None
+    """Reset the module-level DB connections before/after each test."""
+    db_module.reset_connection()
     yield
-    if db_module._connection is not None:
-        db_module._connection.close()
-    db_module._connection = None
-    db_module._data_source_path = None
+    db_module.reset_connection()
 
 
-@pytest.fixture()
-def in_memory_db():
-    """Create a minimal in-memory SQLite DB and inject it into the db module."""
-    conn = sqlite3.connect(":memory:")
+EMPLOYEE_ROWS = (
+    (1, "Alice", "Engineering", 70000),
+    (2, "Bob", "Marketing", 55000),
+    (3, "Carol", "Engineering", 65000),
+)
+SALES_ROWS = (
+    (1, "Widget", 10.0, 5),
+    (2, "Gadget", 25.0, 3),
+    (3, "Widget", 10.0, 8),
+)
+
+
+@pytest.fixture(scope="session")
+def _seeded_db():
+    """Build the in-memory schema and seed data once for the whole session."""
+    # Autocommit, so the per-test SAVEPOINT is the outermost transaction
+    conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+    # Nothing to recover in a throwaway database
+    conn.execute("PRAGMA journal_mode=MEMORY")
+    conn.execute("PRAGMA synchronous=OFF")
+
+    conn.execute("BEGIN")  # one transaction for the whole seed
     conn.execute(
         """
         CREATE TABLE employees (
@@ -42,24 +56,30 @@ def in_memory_db():
         )
         """
     )
+    conn.executemany("INSERT INTO employees VALUES (?, ?, ?, ?)", EMPLOYEE_ROWS)
+    conn.executemany("INSERT INTO sales VALUES (?, ?, ?, ?)", SALES_ROWS)
+    conn.execute("COMMIT")
+
+    yield conn
+    conn.close()
 
-    employees = [
-        (1, "Alice", "Engineering", 70000),
-        (2, "Bob", "Marketing", 55000),
-        (3, "Carol", "Engineering", 65000),
-    ]
-    conn.executemany("INSERT INTO employees VALUES (?, ?, ?, ?)", employees)
-
-    sales = [
-        (1, "Widget", 10.0, 5),
-        (2, "Gadget", 25.0, 3),
-        (3, "Widget", 10.0, 8),
-    ]
-    conn.executemany("INSERT INTO sales VALUES (?, ?, ?, ?)", sales)
-    conn.commit()
-
-    # Inject into the db module
-    db_module._connection = conn
+
+@pytest.fixture()
+def in_memory_db(_seeded_db):
+    """
+    Inject the shared in-memory DB into the db module for one test.
+
+    Anything the test changes (extra tables, ALTERs, inserted rows) is
+    rolled back to a savepoint afterwards, so the seed is built only once.
+    """
+    conn = _seeded_db
+    conn.execute("SAVEPOINT test_case")
+
+    # Inject into the db module as the connection shared by every thread
+    db_module.reset_connection(conn)
     db_module._data_source_path = ":memory:"
 
-    return conn
+    yield conn
+
+    conn.execute("ROLLBACK TO test_case")
+    conn.execute("RELEASE test_case")
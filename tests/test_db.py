@@ -1,8 +1,229 @@
 """Tests for src.db — schema, validation, and query execution."""
 
+import datetime
+import sqlite3
+
+import openpyxl
+import pandas as pd
 import pytest
 
-from src.db import get_schema, validate_query, execute_query
+import src.db as db_module
+from src.db import (
+    ValidatedQuery,
+    init_db,
+    get_schema,
+    validate_query,
+    execute_query,
+    execute_query_rows,
+)
+
+
+@pytest.fixture()
+def csv_file(tmp_path):
+    """A small CSV with integer, real, text, and date columns."""
+    path = tmp_path / "orders.csv"
+    path.write_text(
+        "id,customer,total,placed_on\n"
+        "1,Alice,19.5,2024-01-15\n"
+        "2,Bob,5.25,2024-02-01\n"
+        "3,Carol,42.0,2024-02-10\n"
+    )
+    return path
+
+
+@pytest.fixture()
+def xlsx_file(tmp_path):
+    """A workbook with a typed sheet, a second sheet, and an empty one."""
+    path = tmp_path / "report.xlsx"
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Q1 Sales"
+    ws.append(["region", "units", "price", "sold_on"])
+    ws.append(["North", 5, 2.5, datetime.datetime(2024, 1, 15)])
+    ws.append(["South", 7, 3.0, datetime.datetime(2024, 2, 1, 10, 30)])
+    wb.create_sheet("Staff").append(["name", "age"])
+    wb["Staff"].append(["Ann", 30])
+    wb.create_sheet("Empty")
+    wb.save(path)
+    return path
+
+
+class TestInitDb:
+    def test_loads_csv_as_table(self, csv_file):
+        init_db(str(csv_file))
+        schema = get_schema()
+        assert list(schema.keys()) == ["orders"]
+        type_map = dict(zip(*schema["orders"]))
+        assert type_map["id"] == "INTEGER"
+        assert type_map["total"] == "REAL"
+        assert type_map["customer"] == "TEXT"
+
+    def test_csv_rows_queryable(self, csv_file):
+        init_db(str(csv_file))
+        df = execute_query("SELECT customer, placed_on FROM orders ORDER BY id")
+        assert list(df["customer"]) == ["Alice", "Bob", "Carol"]
+        assert list(df["placed_on"]) == ["2024-01-15", "2024-02-01", "2024-02-10"]
+
+    def test_arrow_csv_loader_names_columns_like_pandas(self, tmp_path, monkeypatch):
+        pytest.importorskip("pyarrow")
+        calls = []
+        load = db_module._load_csv_arrow
+        monkeypatch.setattr(
+            db_module, "_load_csv_arrow", lambda *args: calls.append(args) or load(*args)
+        )
+        path = tmp_path / "dupes.csv"
+        path.write_text(",a,a,b\n0,1,2,x\n1,3,4,y\n")
+        init_db(str(path))
+        assert len(calls) == 1
+        assert get_schema()["dupes"][0] == ("Unnamed: 0", "a", "a.1", "b")
+        assert execute_query_rows('SELECT "a.1" FROM dupes')[1] == [(2,), (4,)]
+
+    def test_streaming_csv_loader_names_columns_like_pandas(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("USE_PANDAS_CSV", "0")
+        path = tmp_path / "dupes.csv"
+        path.write_text(",a,a,b\n0,1,2,x\n1,3,4,y\n")
+        init_db(str(path))
+        assert get_schema()["dupes"][0] == ("Unnamed: 0", "a", "a.1", "b")
+        assert execute_query_rows('SELECT "a.1" FROM dupes')[1] == [(2,), (4,)]
+
+    def test_streaming_csv_loader_keeps_underscored_codes_as_text(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("USE_PANDAS_CSV", "0")
+        path = tmp_path / "codes.csv"
+        path.write_text("code,ratio\n10_20,1_0.5\n30_40,2.5\n")
+        init_db(str(path))
+        assert get_schema()["codes"][1] == ("TEXT", "TEXT")
+        assert execute_query_rows("SELECT code FROM codes")[1] == [("10_20",), ("30_40",)]
+
+    def test_streaming_csv_loader_keeps_long_ids_exact(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("USE_PANDAS_CSV", "0")
+        monkeypatch.setattr(db_module, "_CSV_SNIFF_ROWS", 1)
+        path = tmp_path / "ids.csv"
+        # n's second value overflows INTEGER after sniffing already chose it
+        path.write_text(
+            "big,n\n12345678901234567890,1\n98765432109876543210,99999999999999999999\n"
+        )
+        init_db(str(path))
+        assert get_schema()["ids"][1] == ("TEXT", "INTEGER")
+        assert execute_query_rows("SELECT big, n FROM ids")[1] == [
+            ("12345678901234567890", 1),
+            # Kept as text by the loader; INTEGER affinity then stores a REAL
+            ("98765432109876543210", 1e20),
+        ]
+
+    def test_streaming_csv_loader(self, csv_file, monkeypatch):
+        monkeypatch.setenv("USE_PANDAS_CSV", "0")
+        init_db(str(csv_file))
+        type_map = dict(zip(*get_schema()["orders"]))
+        assert type_map == {
+            "id": "INTEGER",
+            "customer": "TEXT",
+            "total": "REAL",
+            "placed_on": "TEXT",
+        }
+        df = execute_query("SELECT SUM(total) AS s FROM orders")
+        assert df["s"][0] == pytest.approx(66.75)
+
+    @pytest.mark.parametrize("use_pandas", ["0", "1"])
+    def test_loads_excel_sheets_as_tables(self, xlsx_file, monkeypatch, use_pandas):
+        monkeypatch.setenv("USE_PANDAS_EXCEL", use_pandas)
+        if use_pandas == "1":
+            # pandas can't write a table without columns — drop the empty sheet
+            wb = openpyxl.load_workbook(xlsx_file)
+            del wb["Empty"]
+            wb.save(xlsx_file)
+        init_db(str(xlsx_file))
+        schema = get_schema()
+        assert sorted(schema) == ["Q1_Sales", "Staff"]
+        type_map = dict(zip(*schema["Q1_Sales"]))
+        assert type_map == {
+            "region": "TEXT",
+            "units": "INTEGER",
+            "price": "REAL",
+            "sold_on": "TIMESTAMP",
+        }
+        _, rows = execute_query_rows("SELECT * FROM Q1_Sales ORDER BY region")
+        assert rows == [
+            ("North", 5, 2.5, "2024-01-15 00:00:00"),
+            ("South", 7, 3.0, "2024-02-01 10:30:00"),
+        ]
+
+    def test_streaming_excel_chunks_rows(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(db_module, "_EXCEL_CHUNK_ROWS", 3)
+        path = tmp_path / "big.xlsx"
+        wb = openpyxl.Workbook()
+        wb.active.append(["n", "label"])
+        for i in range(10):
+            wb.active.append([i, None if i % 2 else f"row {i}"])
+        wb.save(path)
+
+        init_db(str(path))
+        _, rows = execute_query_rows("SELECT COUNT(*), SUM(n), COUNT(label) FROM Sheet")
+        assert rows == [(10, 45, 5)]
+
+    def test_sqlite_connection_is_query_only(self, tmp_path):
+        path = tmp_path / "app.db"
+        setup = sqlite3.connect(path)
+        setup.execute("CREATE TABLE t (x INTEGER)")
+        setup.close()
+
+        init_db(str(path))
+        for conn in db_module._owned_connections:
+            assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+            # The file's journal mode is left as it was
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO t VALUES (1)")
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["app.db"]
+
+    def test_csv_connection_is_query_only(self, csv_file):
+        init_db(str(csv_file))
+        for conn in db_module._owned_connections:
+            assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+
+    def test_connection_reused_within_thread(self, csv_file):
+        init_db(str(csv_file))
+        conn = db_module._get_conn()
+        execute_query("SELECT * FROM orders")
+        assert db_module._get_conn() is conn
+        assert db_module._owned_connections == [conn]
+
+    def test_threads_get_own_connections_to_csv_data(self, csv_file):
+        import threading
+
+        init_db(str(csv_file))
+        seen = []
+
+        def worker():
+            conn = db_module._get_conn()
+            seen.append((conn, conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]))
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        (conn, count), = seen
+        assert count == 3
+        assert conn is not db_module._get_conn()
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+
+    def test_reset_keeps_caller_connection_open(self, in_memory_db):
+        db_module.reset_connection()
+        assert in_memory_db.execute("SELECT COUNT(*) FROM employees").fetchone()[0] == 3
+
+    def test_concurrent_queries(self, csv_file):
+        from concurrent.futures import ThreadPoolExecutor
+
+        init_db(str(csv_file))
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(
+                    lambda _: len(execute_query("SELECT * FROM orders")), range(32)
+                )
+            )
+        assert results == [3] * 32
+
+    def test_rejects_unsupported_extension(self, tmp_path):
+        with pytest.raises(ValueError, match="Unsupported file type"):
+            init_db(str(tmp_path / "data.parquet"))
 
 
 class TestGetSchema:
@@ -12,16 +233,32 @@ class TestGetSchema:
 
     def test_column_info(self, in_memory_db):
         schema = get_schema()
-        emp_cols = {c["name"] for c in schema["employees"]}
+        emp_cols = set(schema["employees"][0])
         assert emp_cols == {"id", "name", "department", "salary"}
 
     def test_column_types(self, in_memory_db):
         schema = get_schema()
-        type_map = {c["name"]: c["type"] for c in schema["employees"]}
+        type_map = dict(zip(*schema["employees"]))
         assert type_map["id"] == "INTEGER"
         assert type_map["name"] == "TEXT"
         assert type_map["salary"] == "REAL"
 
+    def test_schema_is_cached(self, in_memory_db):
+        first = get_schema()
+        assert get_schema() is first
+
+    def test_ddl_refreshes_cache(self, in_memory_db):
+        first = get_schema()
+        in_memory_db.execute("CREATE TABLE extra (x INTEGER)")
+        assert "extra" in get_schema()
+        assert "extra" not in first
+
+    def test_init_db_invalidates_cache(self, in_memory_db, csv_file):
+        assert "employees" in get_schema()
+        db_module.reset_connection()
+        init_db(str(csv_file))
+        assert list(get_schema().keys()) == ["orders"]
+
 
 class TestValidateQuery:
     @pytest.mark.parametrize(
@@ -32,6 +269,11 @@ class TestValidateQuery:
             "WITH cte AS (SELECT 1) SELECT * FROM cte",
             "EXPLAIN SELECT 1",
             "PRAGMA table_info('employees')",
+            "SELECT 1;",
+            "SELECT REPLACE(name, 'a', 'b') FROM employees",
+            "SELECT 'DROP TABLE employees' AS note",
+            'SELECT "delete" FROM employees',
+            "-- latest hires\nSELECT * FROM employees",
         ],
     )
     def test_allows_safe_queries(self, sql):
@@ -41,18 +283,29 @@ class TestValidateQuery:
         "sql",
         [
             "DROP TABLE employees",
+            "drop table employees",
             "DELETE FROM employees",
             "INSERT INTO employees VALUES (99, 'Hack', 'IT', 0)",
             "UPDATE employees SET salary = 0",
             "ALTER TABLE employees ADD COLUMN x TEXT",
             "CREATE TABLE evil (id INT)",
             "ATTACH DATABASE ':memory:' AS hack",
+            "REPLACE INTO employees VALUES (1, 'X', 'IT', 0)",
+            "INSERT OR REPLACE INTO employees VALUES (1, 'X', 'IT', 0)",
+            "TRUNCATE TABLE employees",
+            "GRANT SELECT ON employees TO hack",
+            "MERGE INTO employees USING sales ON 1 WHEN MATCHED THEN DELETE",
         ],
     )
     def test_rejects_dangerous_queries(self, sql):
         with pytest.raises(ValueError):
             validate_query(sql)
 
+    @pytest.mark.parametrize("sql", ["REINDEX employees", "BEGIN", "ANALYZE"])
+    def test_rejects_non_query_statements(self, sql):
+        with pytest.raises(ValueError, match="Only SELECT, WITH"):
+            validate_query(sql)
+
     def test_rejects_empty_query(self):
         with pytest.raises(ValueError, match="Empty query"):
             validate_query("   ")
@@ -79,6 +332,112 @@ class TestValidateQuery:
                 "SELECT * FROM (DELETE FROM employees RETURNING *)"
             )
 
+    def test_escaped_quotes_stay_inside_literal(self):
+        """Doubled quotes don't end a literal, so its contents stay blanked."""
+        validate_query("SELECT 'it''s; DROP TABLE employees' AS x")
+        with pytest.raises(ValueError, match="forbidden keyword: 'DELETE'"):
+            validate_query("SELECT 'it''s' AS x FROM (DELETE FROM employees RETURNING *)")
+
+    def test_rejects_statement_after_quoted_semicolon(self):
+        """A ';' inside a string literal must not hide a second statement."""
+        with pytest.raises(ValueError, match="Multiple statements"):
+            validate_query("SELECT ';' AS x; DROP TABLE employees")
+
+    def test_quote_inside_brackets_does_not_hide_statement(self):
+        """A ' inside a [bracketed] identifier is not the start of a literal."""
+        with pytest.raises(ValueError, match="Multiple statements"):
+            validate_query("SELECT [a'b] FROM t; DROP TABLE t")
+
+    def test_allows_bracketed_identifiers(self):
+        assert validate_query("SELECT [drop] FROM [my table]") == (
+            "SELECT [drop] FROM [my table]"
+        )
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "PRAGMA query_only=0",
+            "pragma main.query_only(false)",
+            'PRAGMA "query_only" = 0',
+            "PRAGMA [query_only]=0",
+            "PRAGMA `query_only` = false",
+            "PRAGMA 'query_only'=0",
+            'PRAGMA main."query_only"=0',
+            'PRAGMA "main" . [query_only] = 0',
+            "PRAGMA /* x */ query_only = 0",
+        ],
+    )
+    def test_rejects_query_only_toggle(self, sql):
+        with pytest.raises(ValueError, match="query_only"):
+            validate_query(sql)
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA journal_mode(WAL)",
+            'PRAGMA "journal_mode" = wal',
+            "PRAGMA user_version = 7",
+            "PRAGMA cache_size",
+            "EXPLAIN PRAGMA journal_mode=WAL",
+            "explain query plan pragma foreign_keys = ON",
+            "PRAGMA",
+        ],
+    )
+    def test_rejects_non_introspection_pragmas(self, sql):
+        with pytest.raises(ValueError, match="PRAGMA"):
+            validate_query(sql)
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "PRAGMA table_info = employees",
+            "PRAGMA main.index_list = employees",
+        ],
+    )
+    def test_rejects_introspection_pragma_assignment(self, sql):
+        with pytest.raises(ValueError, match="cannot be assigned"):
+            validate_query(sql)
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "PRAGMA main.table_info(employees)",
+            'PRAGMA "index_list"("employees")',
+            "PRAGMA foreign_key_list(sales)",
+            "EXPLAIN QUERY PLAN SELECT * FROM employees",
+        ],
+    )
+    def test_allows_introspection_pragmas(self, sql):
+        validate_query(sql)  # Should not raise
+
+    def test_rejects_comment_only_query(self):
+        with pytest.raises(ValueError, match="Empty query"):
+            validate_query("-- nothing to see here")
+
+    def test_sqlparse_verifier(self, monkeypatch):
+        """The debug-mode sqlparse verifier agrees with the fast path."""
+        monkeypatch.setattr(db_module, "_SQLPARSE_VERIFY", True)
+        validate_query("SELECT * FROM employees")
+        with pytest.raises(ValueError):
+            validate_query("DROP TABLE employees")
+
+    def test_returns_normalized_validated_query(self):
+        query = validate_query("  SELECT * FROM employees;  ")
+        assert isinstance(query, db_module.ValidatedQuery)
+        assert query == "SELECT * FROM employees"
+        assert validate_query(query) is query
+
+    def test_verdicts_are_memoized(self):
+        db_module._validate_cached.cache_clear()
+        validate_query("SELECT 1")
+        validate_query("  SELECT 1\n")
+        for _ in range(2):
+            with pytest.raises(ValueError, match="forbidden keyword: 'DROP'"):
+                validate_query("DROP TABLE employees")
+        info = db_module._validate_cached.cache_info()
+        assert (info.hits, info.misses) == (2, 2)
+
     def test_allows_column_named_like_keyword(self):
         """Column aliases like 'update_count' shouldn't trigger false positives."""
         # sqlparse correctly identifies 'update_count' as an identifier, not DML
@@ -100,3 +459,112 @@ class TestExecuteQuery:
     def test_rejects_write_query(self, in_memory_db):
         with pytest.raises(ValueError):
             execute_query("DELETE FROM employees WHERE id = 1")
+
+    @pytest.mark.parametrize(
+        "sql", ['PRAGMA "query_only" = 0', "PRAGMA [query_only]=0", "PRAGMA 'query_only'=0"]
+    )
+    def test_quoted_query_only_toggle_cannot_unlock_writes(self, tmp_path, sql):
+        path = tmp_path / "app.db"
+        sqlite3.connect(path).close()
+        init_db(str(path))
+        with pytest.raises(ValueError, match="query_only"):
+            execute_query_rows(sql)
+        # Even bypassing the validator, the connection is still query_only
+        with pytest.raises(ValueError, match="attempted to write"):
+            execute_query_rows(ValidatedQuery("PRAGMA user_version = 42"))
+        with sqlite3.connect(path) as check:
+            assert check.execute("PRAGMA user_version").fetchone()[0] == 0
+        check.close()
+
+    def test_engine_blocked_write_is_rejected(self, tmp_path):
+        """Writes that get past the validator are refused by query_only."""
+        path = tmp_path / "app.db"
+        sqlite3.connect(path).close()
+        init_db(str(path))
+        with pytest.raises(ValueError, match="attempted to write"):
+            execute_query(ValidatedQuery("PRAGMA user_version = 7"))
+
+    def test_journal_mode_cannot_be_changed(self, tmp_path):
+        path = tmp_path / "app.db"
+        sqlite3.connect(path).close()
+        init_db(str(path))
+        for sql in ("PRAGMA journal_mode=WAL", "PRAGMA journal_mode(WAL)"):
+            with pytest.raises(ValueError, match="journal_mode"):
+                execute_query_rows(sql)
+        db_module.reset_connection()
+        with sqlite3.connect(path) as check:
+            assert check.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        check.close()
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["app.db"]
+
+    def test_validated_query_is_not_revalidated(self, in_memory_db, monkeypatch):
+        query = validate_query("SELECT name FROM employees")
+
+        def fail(*args):
+            raise AssertionError("validated twice")
+
+        monkeypatch.setattr(db_module, "_validate_cached", fail)
+        assert len(execute_query(query)) == 3
+        wrapped = db_module.derived_query("SELECT COUNT(*) FROM", query)
+        assert execute_query_rows(wrapped)[1] == [(3,)]
+
+    def test_streams_in_chunks(self, in_memory_db, monkeypatch):
+        monkeypatch.setattr(db_module, "_FETCH_CHUNK_ROWS", 2)
+        df = execute_query("SELECT id, name FROM employees ORDER BY id")
+        assert list(df["id"]) == [1, 2, 3]
+        assert list(df["name"]) == ["Alice", "Bob", "Carol"]
+
+    def test_keeps_duplicate_column_names(self, in_memory_db):
+        df = execute_query("SELECT id, name, id FROM employees ORDER BY id")
+        assert list(df.columns) == ["id", "name", "id"]
+        assert df.iloc[:, 2].tolist() == [1, 2, 3]
+
+    def test_repetitive_text_becomes_categorical(self, in_memory_db):
+        df = execute_query(
+            "SELECT department, name FROM employees "
+            "UNION ALL SELECT department, name || '2' FROM employees"
+        )
+        assert df["department"].dtype == "category"
+        assert df["name"].dtype != "category"
+        assert sorted(df["department"].unique()) == ["Engineering", "Marketing"]
+
+    def test_rows_path(self, in_memory_db):
+        columns, rows = execute_query_rows(
+            "SELECT name, salary FROM employees ORDER BY id"
+        )
+        assert columns == ["name", "salary"]
+        assert rows[0] == ("Alice", 70000.0)
+        assert len(rows) == 3
+
+    def test_empty_result_keeps_columns(self, in_memory_db):
+        df = execute_query("SELECT name FROM employees WHERE salary < 0")
+        assert df.empty
+        assert list(df.columns) == ["name"]
+
+    def test_in_memory_sources_skip_adbc(self, in_memory_db, csv_file):
+        assert not db_module._adbc_enabled()
+        db_module.reset_connection()
+        init_db(str(csv_file))
+        assert not db_module._adbc_enabled()
+
+    def test_adbc_readout_matches_sqlite3(self, tmp_path, monkeypatch):
+        pytest.importorskip("adbc_driver_sqlite")
+        path = tmp_path / "app.db"
+        with sqlite3.connect(path) as setup:
+            setup.execute("CREATE TABLE t (id INTEGER, name TEXT, score REAL)")
+            setup.executemany(
+                "INSERT INTO t VALUES (?, ?, ?)", [(1, "a", 1.5), (2, "b", None)]
+            )
+        setup.close()
+        init_db(str(path))
+        assert db_module._adbc_enabled()
+        sql = "SELECT id, name, score, id FROM t ORDER BY id"
+        df = execute_query(sql)
+        monkeypatch.setenv("USE_ADBC", "0")
+        expected = execute_query(sql)
+        assert all(isinstance(dtype, pd.ArrowDtype) for dtype in df.dtypes)
+        assert not any(isinstance(dtype, pd.ArrowDtype) for dtype in expected.dtypes)
+        assert list(df.columns) == ["id", "name", "score", "id"]
+        assert df.astype(object).where(df.notna(), None).values.tolist() == (
+            expected.astype(object).where(expected.notna(), None).values.tolist()
+        )
@@ -1,5 +1,6 @@
 """Tests for src.resources — schema formatting."""
 
+import src.db as db_module
 from src.resources import format_schema
 
 
@@ -27,3 +28,20 @@ class TestFormatSchema:
     def test_contains_source_info(self, in_memory_db):
         text = format_schema()
         assert "Connected to:" in text
+
+    def test_rendered_text_is_cached(self, in_memory_db):
+        assert format_schema() is format_schema()
+
+    def test_rerenders_after_invalidation(self, in_memory_db):
+        before = format_schema()
+        in_memory_db.execute("CREATE TABLE extra (x INTEGER)")
+        db_module._invalidate_schema_cache()
+        after = format_schema()
+        assert "`extra`" not in before
+        assert "`extra`" in after
+
+    def test_rerenders_after_ddl(self, in_memory_db):
+        before = format_schema()
+        in_memory_db.execute("ALTER TABLE sales ADD COLUMN region TEXT")
+        assert "`region`" not in before
+        assert "`region`" in format_schema()
@@ -1,7 +1,14 @@
 """Tests for src.tools — query and visualize tools."""
 
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
 import pytest
 
+import src.db as db_module
+from src.db import execute_query
 from src.tools.query import run_read_only_query_tool
 from src.tools.visualize import visualize_data_tool
 
@@ -32,6 +39,54 @@ class TestRunReadOnlyQueryTool:
         result = run_read_only_query_tool("SELECT * FROM employees")
         assert "(3 rows)" in result
 
+    def test_markdown_layout(self, in_memory_db):
+        result = run_read_only_query_tool(
+            "SELECT id, name, salary, NULL AS note FROM employees WHERE id = 1"
+        )
+        lines = result.splitlines()
+        assert "| id | name | salary | note |" in lines
+        assert "|---|---|---|---|" in lines
+        assert "| 1 | Alice | 70000 |  |" in lines
+
+    def test_large_result_is_truncated_with_true_count(self, large_table):
+        result = run_read_only_query_tool("SELECT * FROM readings ORDER BY id")
+        assert "(12000 rows)" in result
+        assert "Showing first 100 of 12000 total rows" in result
+        assert "| 99 | sensor1 | 99 |" in result
+        assert "| 100 |" not in result
+
+    def test_duplicate_column_names_match_the_sql(self, in_memory_db):
+        result = run_read_only_query_tool(
+            "SELECT a.id, b.id FROM employees a JOIN employees b ON a.id = b.id"
+        )
+        assert "| id | id |" in result.splitlines()
+
+    def test_large_unwrappable_result_is_counted(self, in_memory_db):
+        in_memory_db.execute(f"CREATE TABLE wide ({', '.join(f'c{i}' for i in range(150))})")
+        result = run_read_only_query_tool("PRAGMA table_info(wide)")
+        assert "Showing first 100 of 150 total rows" in result
+
+    def test_failing_sql_runs_once(self, in_memory_db, monkeypatch):
+        calls = []
+        execute = db_module._execute
+        monkeypatch.setattr(db_module, "_execute", lambda q: calls.append(q) or execute(q))
+        assert "❌" in run_read_only_query_tool("SELECT missing FROM employees")
+        assert len(calls) == 1
+
+    def test_unwrappable_statement_runs_as_is(self, in_memory_db):
+        result = run_read_only_query_tool("PRAGMA table_info(employees)")
+        assert "(4 rows)" in result
+        assert "salary" in result
+
+
+@pytest.fixture()
+def large_table(in_memory_db):
+    """A `readings` table with more rows than the in-pandas summary limit."""
+    rows = [(i, f"sensor{i % 7}", float(i % 100)) for i in range(12_000)]
+    in_memory_db.execute("CREATE TABLE readings (id INTEGER, sensor TEXT, value REAL)")
+    in_memory_db.executemany("INSERT INTO readings VALUES (?, ?, ?)", rows)
+    return rows
+
 
 class TestVisualizeDataTool:
     def test_bar_chart(self, in_memory_db):
@@ -54,6 +109,25 @@ class TestVisualizeDataTool:
         assert "Unsupported" in text
         assert img is None
 
+    def test_unsupported_chart_type_skips_database(self, monkeypatch):
+        import src.tools.visualize as visualize_module
+
+        def fail():
+            raise AssertionError("database touched")
+
+        monkeypatch.setattr(visualize_module, "get_schema_version", fail)
+        text, img = visualize_data_tool("SELECT 1", chart_type="radar")
+        assert "Unsupported" in text
+        assert img is None
+
+    def test_unreadable_data_source_returns_error(self, tmp_path, monkeypatch):
+        path = tmp_path / "broken.db"
+        path.write_bytes(b"not a sqlite database" * 100)
+        monkeypatch.setenv("DATA_SOURCE", str(path))
+        text, img = visualize_data_tool("SELECT 1")
+        assert text.startswith("❌")
+        assert img is None
+
     def test_empty_query_result(self, in_memory_db):
         text, img = visualize_data_tool(
             "SELECT * FROM employees WHERE salary > 999999",
@@ -79,6 +153,17 @@ class TestVisualizeDataTool:
         assert "Summary Statistics" in text
         assert img is not None
 
+    def test_summary_statistics_match_describe(self, in_memory_db):
+        text, img = visualize_data_tool(
+            "SELECT name, salary FROM employees", chart_type="bar"
+        )
+        expected = execute_query("SELECT salary FROM employees")["salary"].describe()
+        assert "|  | salary |" in text
+        for label in ("count", "mean", "std", "min", "25%", "50%", "75%", "max"):
+            value = expected[label]
+            cell = f"{value:.6g}" if label != "count" else str(int(value))
+            assert f"| {label} | {cell} |" in text
+
     @pytest.mark.parametrize("chart_type", ["line", "scatter", "pie", "hist"])
     def test_all_chart_types(self, in_memory_db, chart_type):
         text, img = visualize_data_tool(
@@ -86,3 +171,173 @@ class TestVisualizeDataTool:
             chart_type=chart_type,
         )
         assert img is not None
+
+    def test_concurrent_renders(self, in_memory_db):
+        from concurrent.futures import ThreadPoolExecutor
+
+        def render(i):
+            return visualize_data_tool(
+                "SELECT name, salary FROM employees", chart_type="bar", title=f"Chart {i}"
+            )
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(render, range(8)))
+        assert all(img is not None for _, img in results)
+        assert all(f"Chart {i}" in text for i, (text, _) in enumerate(results))
+
+    def test_repeat_call_is_memoized(self, in_memory_db):
+        sql = "SELECT name, salary FROM employees"
+        first = visualize_data_tool(sql, chart_type="bar", title="Salaries")
+        second = visualize_data_tool("  " + sql + "\n", chart_type="BAR", title="Salaries")
+        assert second is first
+
+    def test_cache_evicts_least_recently_used(self, in_memory_db, monkeypatch):
+        from collections import OrderedDict
+
+        import src.tools.visualize as visualize_module
+
+        monkeypatch.setattr(visualize_module, "_RESULT_CACHE_SIZE", 2)
+        monkeypatch.setattr(visualize_module, "_result_cache", OrderedDict())
+        sql = "SELECT name, salary FROM employees"
+        bar = visualize_data_tool(sql, chart_type="bar")
+        line = visualize_data_tool(sql, chart_type="line")
+        assert visualize_data_tool(sql, chart_type="bar") is bar  # now most recent
+        visualize_data_tool(sql, chart_type="scatter")  # evicts line
+        assert visualize_data_tool(sql, chart_type="bar") is bar
+        assert visualize_data_tool(sql, chart_type="line") is not line
+
+    def test_cache_invalidated_with_schema(self, in_memory_db):
+        sql = "SELECT name, salary FROM employees"
+        first = visualize_data_tool(sql, chart_type="bar")
+        db_module._invalidate_schema_cache()
+        assert visualize_data_tool(sql, chart_type="bar") is not first
+
+    def test_cache_invalidated_by_ddl(self, in_memory_db):
+        sql = "SELECT name, salary FROM employees"
+        first = visualize_data_tool(sql, chart_type="bar")
+        in_memory_db.execute("CREATE INDEX idx_salary ON employees (salary)")
+        assert visualize_data_tool(sql, chart_type="bar") is not first
+
+    def test_failures_are_not_memoized(self, in_memory_db):
+        sql = "SELECT name, bonus FROM employees"
+        text, img = visualize_data_tool(sql, chart_type="bar")
+        assert "❌" in text and img is None
+        in_memory_db.execute("ALTER TABLE employees ADD COLUMN bonus REAL DEFAULT 1")
+        text, img = visualize_data_tool(sql, chart_type="bar")
+        assert img is not None
+
+    def test_large_bar_chart_is_aggregated_in_sql(self, large_table):
+        text, img = visualize_data_tool(
+            "SELECT sensor, value FROM readings;", chart_type="bar"
+        )
+        assert img is not None
+        assert "12000 rows" in text
+        assert "Aggregated" in text
+        assert "top 7 groups" in text
+
+    def test_large_result_summary_matches_pandas(self, large_table):
+        import pandas as pd
+
+        text, img = visualize_data_tool(
+            "SELECT id, value FROM readings", chart_type="hist", x_column="value"
+        )
+        assert img is not None
+        expected = pd.DataFrame(large_table, columns=["id", "sensor", "value"])
+        expected = expected[["id", "value"]].describe()
+        assert f"{expected.loc['std', 'value']:.4f}"[:6] in text
+        assert "Aggregated" not in text
+
+    def test_duplicate_column_names_match_the_sql(self, in_memory_db):
+        text, img = visualize_data_tool(
+            "SELECT a.id, b.id, a.salary FROM employees a "
+            "JOIN employees b ON a.id = b.id",
+            chart_type="hist",
+            x_column="salary",
+        )
+        assert img is not None, text
+        assert "|  | id | id | salary |" in text
+        assert "id:1" not in text
+
+    def test_failing_sql_runs_once(self, in_memory_db, monkeypatch):
+        calls = []
+        execute = db_module._execute
+        monkeypatch.setattr(db_module, "_execute", lambda q: calls.append(q) or execute(q))
+        text, img = visualize_data_tool("SELECT missing FROM employees")
+        assert "Query Error" in text
+        assert len(calls) == 1
+
+    def test_unwrappable_statement_still_runs(self, in_memory_db):
+        text, img = visualize_data_tool(
+            "PRAGMA table_info('employees')", chart_type="bar", x_column="name",
+            y_column="cid",
+        )
+        assert img is not None
+
+
+def test_tool_modules_import_without_heavy_dependencies():
+    """pandas/matplotlib/etc. are only imported when a tool actually needs them."""
+    code = (
+        "import sys, src.db, src.resources, src.tools.query, src.tools.visualize\n"
+        "heavy = ['pandas', 'matplotlib', 'numpy', 'PIL', 'sqlparse', 'pyarrow']\n"
+        "print(','.join(m for m in heavy if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_error_paths_do_not_import_pandas():
+    """Rejected SQL, bad chart types, and SQL errors answer without pandas."""
+    code = (
+        "import sys, sqlite3, src.db as db\n"
+        "from src.tools.query import run_read_only_query_tool\n"
+        "from src.tools.visualize import visualize_data_tool\n"
+        "db.reset_connection(sqlite3.connect(':memory:', check_same_thread=False))\n"
+        "run_read_only_query_tool('DROP TABLE t')\n"
+        "visualize_data_tool('SELECT 1', chart_type='radar')\n"
+        "visualize_data_tool('DELETE FROM t')\n"
+        "visualize_data_tool('SELECT * FROM missing')\n"
+        "print(','.join(m for m in ['pandas', 'matplotlib'] if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_warm_up_initializes_matplotlib_without_caching():
+    import src.tools.visualize as visualize_module
+
+    cached = len(visualize_module._result_cache)
+    visualize_module.warm_up()
+    assert visualize_module._mpl_initialized
+    assert len(visualize_module._result_cache) == cached
+
+
+@pytest.mark.parametrize("chart_type", ["bar", "line", "scatter", "hist"])
+def test_adbc_results_with_nulls_render(tmp_path, chart_type):
+    """Arrow-backed columns (pd.NA for NULL) chart like the sqlite3 path."""
+    pytest.importorskip("adbc_driver_sqlite")
+    path = tmp_path / "app.db"
+    with sqlite3.connect(path) as setup:
+        setup.execute("CREATE TABLE t (id INTEGER, name TEXT, score REAL, n INTEGER)")
+        setup.executemany(
+            "INSERT INTO t VALUES (?, ?, ?, ?)",
+            [(1, "a", 1.5, 4), (2, "b", None, None), (3, "c", 2.5, 6)],
+        )
+    setup.close()
+    db_module.init_db(str(path))
+    assert db_module._adbc_enabled()
+
+    for sql in ("SELECT name, score FROM t", "SELECT id, n FROM t", "SELECT * FROM t"):
+        text, img = visualize_data_tool(sql, chart_type=chart_type)
+        assert img is not None, text